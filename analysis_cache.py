@@ -0,0 +1,65 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+
+# Messages whose responder decision is remembered per trigger index (so per config version).
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "4096"))
+# Tokenized messages; tokenization does not depend on the triggers, so these survive reloads.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+# Per-token fuzzy lookups, per trigger index.
+FUZZY_CACHE_SIZE = int(os.getenv("FUZZY_CACHE_SIZE", "4096"))
+
+MISSING = object()
+
+class CacheStats:
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+DECISIONS = CacheStats("decision")
+TOKENS = CacheStats("token")
+FUZZY = CacheStats("fuzzy")
+ALL_STATS = (DECISIONS, TOKENS, FUZZY)
+
+class LRUCache:
+    # Thread-safe, since matching can run on several worker threads at once.
+
+    def __init__(self, maxsize, stats=None):
+        self.maxsize = maxsize
+        self.stats = stats
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key, MISSING)
+            if value is not MISSING:
+                self._data.move_to_end(key)
+        if self.stats is not None:
+            if value is MISSING:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
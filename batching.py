@@ -0,0 +1,73 @@
+import asyncio
+import os
+from collections import deque
+
+# Set MESSAGE_BATCHING=1 to group messages before matching instead of handling each one alone.
+MESSAGE_BATCHING = os.getenv("MESSAGE_BATCHING", "0") == "1"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_DELAY = float(os.getenv("BATCH_MAX_DELAY", "0.05"))
+BATCH_MAX_DEPTH = int(os.getenv("BATCH_MAX_DEPTH", "500"))
+# "oldest" evicts the longest-waiting queued message, "newest" refuses the incoming one.
+BATCH_DROP_POLICY = os.getenv("BATCH_DROP_POLICY", "oldest").lower()
+
+class MessageBatcher:
+    def __init__(self, process_batch, max_size=BATCH_MAX_SIZE, max_delay=BATCH_MAX_DELAY, max_depth=BATCH_MAX_DEPTH, drop_policy=BATCH_DROP_POLICY):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError(f"Unknown BATCH_DROP_POLICY {drop_policy!r}, expected oldest or newest")
+        self.process_batch = process_batch
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.max_depth = max_depth
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def submit(self, message):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if len(self._queue) >= self.max_depth:
+            self.dropped += 1
+            if self.drop_policy == "newest":
+                return False
+            self._queue.popleft()
+        self._queue.append(message)
+        self._wakeup.set()
+        return True
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(self._queue) < self.max_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        batch = [self._queue.popleft() for _ in range(min(self.max_size, len(self._queue)))]
+        if not self._queue:
+            self._wakeup.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                print(f"Failed to process message batch: {e}")
+            self.batches += 1
+            self.processed += len(batch)
@@ -0,0 +1,274 @@
+# Offline benchmark for the message matcher; no Discord connection is needed.
+#
+#   python -m benchmarks.bench_matcher
+#   python -m benchmarks.bench_matcher --sizes 10 100 1000 --messages 5000 --recorded messages.txt
+#
+# A recorded corpus is a text file with one message per line, or JSONL with a "content"
+# field per line (e.g. exported from a busy channel).
+import argparse
+import copy
+import difflib
+import gc
+import json
+import random
+import re
+import resource
+import sys
+import time
+import tracemalloc
+
+import matcher
+import normalizer
+import prefilter
+import ranking
+import vector_scoring
+from trigger_index import TriggerIndex
+from trigger_store import _with_defaults
+
+TRIGGERS_FILE = "triggers.json"
+SYLLABLES = ["ba", "ke", "lo", "mi", "nu", "ra", "se", "ti", "vo", "za", "der", "pon", "quil", "strum", "ex"]
+CHATTER = [
+    "lol", "that was crazy", "gg everyone", "anyone online", "brb", "nice one", "i just got home",
+    "this game is fun", "who wants to play", "good morning", "see you tomorrow", "what a match",
+]
+
+def load_real_triggers():
+    with open(TRIGGERS_FILE, "r", encoding="utf-8") as f:
+        return _with_defaults(json.load(f))
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+def generate_triggers(responders, seed=0):
+    rng = random.Random(seed)
+    base = load_real_triggers()
+    data = {key: value for key, value in base.items() if key != "responses"}
+    data["responses"] = {}
+    for i in range(responders):
+        triggers = [_word(rng) for _ in range(rng.randint(3, 12))]
+        triggers += [f"{_word(rng)} {_word(rng)}" for _ in range(rng.randint(0, 3))]
+        data["responses"][f"generated-{i}"] = {
+            "triggers": triggers,
+            "category": f"generated-{i}",
+            "response": f"Generated response {i}",
+            "smart_detection": rng.random() < 0.8,
+        }
+    return _with_defaults(data)
+
+def _typo(rng, word):
+    if len(word) < 4:
+        return word
+    i = rng.randrange(len(word))
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i] + word[i:]
+
+def synthetic_corpus(data, count, seed=1):
+    rng = random.Random(seed)
+    triggers = [t for value in data["responses"].values() for t in value.get("triggers", [])]
+    question_words = data.get("question_words") or ["when"]
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            words = [rng.choice(CHATTER) for _ in range(rng.randint(1, 3))]
+        elif roll < 0.85:
+            words = [rng.choice(question_words), "is", "the", _typo(rng, rng.choice(triggers)), rng.choice(CHATTER)]
+        else:
+            words = [rng.choice(question_words), "do", "you", rng.choice(CHATTER)]
+        if rng.random() < 0.05:
+            words += [rng.choice(CHATTER) for _ in range(100)]
+        messages.append(" ".join(words) + rng.choice(["", "?", "!", "??"]))
+    return messages
+
+def recorded_corpus(path):
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("content", "")
+            messages.append(line)
+    return messages
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+def _same_word(token, trigger):
+    if not normalizer.TOKEN_NORMALIZATION or len(trigger.split()) != 1:
+        return False
+    key = normalizer.normalize_token(token)
+    return bool(key) and key == normalizer.normalize_token(trigger)
+
+def reference_match(content, index, nlp):
+    # Brute-force statement of the matching rules: every trigger is checked against the
+    # whole message (boundary-aligned) and every token is scored with difflib directly.
+    content = " ".join(content.lower().split())
+    doc = nlp(content)
+    question_words_in_message = any(token.text in index.question_words for token in doc)
+    # Tokens that normalize to some smart trigger are decided by that alone, never by difflib.
+    smart_triggers = [trigger for responder in index.responders if responder.smart_detection for trigger in responder.triggers]
+    settled = {token.text for token in doc if any(_same_word(token.text, trigger) for trigger in smart_triggers)}
+    for responder in index.responders:
+        phrase_hit = False
+        for trigger in responder.triggers:
+            pattern = " ".join(trigger.lower().split())
+            if not pattern:
+                continue
+            for found in re.finditer("(?=%s)" % re.escape(pattern), content):
+                start, end = found.start(), found.start() + len(pattern)
+                if start > 0 and _is_word_char(pattern[0]) and _is_word_char(content[start - 1]):
+                    continue
+                if end < len(content) and _is_word_char(pattern[-1]) and _is_word_char(content[end]):
+                    continue
+                phrase_hit = True
+                break
+            if phrase_hit:
+                break
+        if not responder.smart_detection:
+            if phrase_hit:
+                return responder.response
+        elif question_words_in_message:
+            if phrase_hit or any(
+                _same_word(token.text, trigger) if token.text in settled
+                else difflib.SequenceMatcher(None, token.text, trigger).ratio() > 0.8
+                for token in doc for trigger in responder.triggers
+            ):
+                return responder.response
+    return None
+
+def match_batched(messages, index, nlp, batch_size=32):
+    results = []
+    for start in range(0, len(messages), batch_size):
+        results.extend(matcher.match_many(messages[start:start + batch_size], index, nlp))
+    return results
+
+# name -> function(messages, index, nlp) returning one decision per message
+IMPLEMENTATIONS = {
+    "match": lambda messages, index, nlp: [matcher.match(m, index, nlp) for m in messages],
+    "match_many": match_batched,
+}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_case(name, data, messages, nlp, check_reference):
+    gc.collect()
+    tracemalloc.start()
+    index = TriggerIndex(copy.deepcopy(data), version=1)
+    for message in messages[:50]:
+        matcher.match(message, index, nlp)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Fresh index and token cache so the timed pass does not start warm.
+    index = TriggerIndex(copy.deepcopy(data), version=1)
+    matcher.TOKEN_CACHE.clear()
+    latencies = []
+    decisions = []
+    started = time.perf_counter()
+    for message in messages:
+        t = time.perf_counter()
+        decisions.append(matcher.match(message, index, nlp))
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    mismatches = {}
+    for impl, run in IMPLEMENTATIONS.items():
+        if impl == "match":
+            continue
+        other = run(messages, TriggerIndex(copy.deepcopy(data), version=1), nlp)
+        mismatches[impl] = sum(1 for a, b in zip(decisions, other) if a != b)
+    agreement = {}
+    if check_reference:
+        reference = [reference_match(m, index, nlp) for m in messages]
+        mismatches["reference"] = sum(1 for a, b in zip(decisions, reference) if a != b)
+        agreement = precision_recall(decisions, reference)
+
+    matched = sum(1 for d in decisions if d)
+    return {
+        "case": name,
+        "responders": len(index.responders),
+        "messages": len(messages),
+        "matched": matched,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "msgs_per_s": len(messages) / elapsed if elapsed else 0.0,
+        "peak_kib": peak / 1024,
+        "mismatches": mismatches,
+        **agreement,
+    }
+
+def precision_recall(decisions, reference):
+    # Treats the reference's replies as ground truth: precision is the share of our replies
+    # it agrees with, recall the share of its replies we give too.
+    correct = sum(1 for a, b in zip(decisions, reference) if a and a == b)
+    answered = sum(1 for a in decisions if a)
+    expected = sum(1 for b in reference if b)
+    return {
+        "precision": correct / answered if answered else 1.0,
+        "recall": correct / expected if expected else 1.0,
+    }
+
+def _ratio(value):
+    return "-" if value is None else f"{value:.3f}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the autoresponder matcher offline.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100, 1000], help="generated responder counts")
+    parser.add_argument("--messages", type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument("--recorded", help="recorded corpus file (text or JSONL)")
+    parser.add_argument("--nlp-mode", default=matcher.NLP_MODE, choices=sorted(matcher.NLP_MODES))
+    parser.add_argument("--reference-limit", type=int, default=300,
+                        help="messages checked against the brute-force reference per case (0 disables)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    prefilter.PREFILTER_REPORT_EVERY = 0
+
+    nlp = matcher.load_nlp(args.nlp_mode)
+    trigger_sets = [("triggers.json", load_real_triggers())]
+    trigger_sets += [(f"generated-{size}", generate_triggers(size)) for size in args.sizes]
+
+    results = []
+    for set_name, data in trigger_sets:
+        corpora = [("synthetic", synthetic_corpus(data, args.messages))]
+        if args.recorded:
+            corpora.append(("recorded", recorded_corpus(args.recorded)))
+        for corpus_name, messages in corpora:
+            check = args.reference_limit > 0
+            case = run_case(f"{set_name}/{corpus_name}", data, messages, nlp, False)
+            if check:
+                sample = messages[:args.reference_limit]
+                checked = run_case(case["case"], data, sample, nlp, True)
+                case["mismatches"]["reference"] = checked["mismatches"]["reference"]
+                case["precision"], case["recall"] = checked["precision"], checked["recall"]
+            results.append(case)
+
+    max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.json:
+        print(json.dumps({"nlp_mode": args.nlp_mode, "scoring_engine": vector_scoring.SCORING_ENGINE, "strategy": ranking.MATCH_STRATEGY, "max_rss_kib": max_rss_kib, "results": results}, indent=2))
+    else:
+        print(f"nlp mode: {args.nlp_mode}, scoring engine: {vector_scoring.SCORING_ENGINE}, strategy: {ranking.MATCH_STRATEGY}, process max RSS: {max_rss_kib / 1024:.1f} MiB")
+        header = f"{'case':<32} {'resp':>5} {'msgs':>6} {'hit':>5} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'msg/s':>9} {'peak KiB':>9} {'prec':>6} {'recall':>6}  mismatches"
+        print(header)
+        print("-" * len(header))
+        for r in results:
+            print(f"{r['case']:<32} {r['responders']:>5} {r['messages']:>6} {r['matched']:>5} {r['p50_ms']:>8.3f} "
+                  f"{r['p99_ms']:>8.3f} {r['max_ms']:>8.3f} {r['msgs_per_s']:>9.0f} {r['peak_kib']:>9.0f} "
+                  f"{_ratio(r.get('precision')):>6} {_ratio(r.get('recall')):>6}  {r['mismatches']}")
+
+    # The reference states the rules engine with first-match-wins, so under the vector engine
+    # or best-match ranking disagreeing with it is reported (prec / recall) but not a failure.
+    strict = not vector_scoring.VECTOR_ENABLED and ranking.MATCH_STRATEGY == "first"
+    failing = [impl for impl in results[0]["mismatches"] if impl != "reference" or strict] if results else []
+    if any(r["mismatches"].get(impl) for r in results for impl in failing):
+        print("Match decisions differ between implementations.", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
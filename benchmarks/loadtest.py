@@ -0,0 +1,219 @@
+# End-to-end load test of the real on_message path against a local stand-in for the
+# Discord gateway. Runs entirely offline.
+#
+#   python -m benchmarks.loadtest --rate 2000 --duration 10 --channels 50
+#
+# Messages are dispatched through bot.dispatch("message", ...) exactly as the gateway
+# would, and channel.send is replaced by a fake that enforces a per-channel rate limit
+# the way discord.py sleeps on 429s.
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+def parse_rate_limit(value):
+    count, per = value.split("/")
+    return int(count), float(per)
+
+class RateLimitedChannel:
+    def __init__(self, channel_id, guild, limit, per, recorder):
+        self.id = channel_id
+        self.guild = guild
+        self.limit = limit
+        self.per = per
+        self.recorder = recorder
+        self.mention = f"<#{channel_id}>"
+        self._window_start = 0.0
+        self._used = 0
+        self._lock = asyncio.Lock()
+
+    async def send(self, content, message_id=None):
+        async with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.per:
+                self._window_start, self._used = now, 0
+            if self._used >= self.limit:
+                self.recorder.rate_limited += 1
+                await asyncio.sleep(self._window_start + self.per - now)
+                self._window_start, self._used = time.monotonic(), 0
+            self._used += 1
+        self.recorder.sent(self, content, message_id)
+
+class ReplyChannel:
+    # Stands in for the channel on a single reply, so the recorder knows which injected
+    # message it answers even when the outbound queue drops other replies around it.
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = channel.id
+        self.message_id = message_id
+
+    async def send(self, content):
+        await self.channel.send(content, self.message_id)
+
+class Recorder:
+    def __init__(self):
+        self.rate_limited = 0
+        self.replies = {}
+        self._pending = {}
+
+    def expect(self, message_id, sent_at):
+        self._pending[message_id] = sent_at
+
+    def sent(self, channel, content, message_id):
+        sent_at = self._pending.pop(message_id, None)
+        self.replies.setdefault(channel.id, []).append((sent_at, time.perf_counter(), content))
+
+def build_config(path, channel_ids):
+    with open("triggers.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["channel_ids"] = channel_ids
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def run(args):
+    import main
+    import matcher
+    import prefilter
+    from benchmarks.bench_matcher import synthetic_corpus
+    from trigger_index import TriggerIndex
+    from watchdog import LoopMonitor
+
+    prefilter.PREFILTER_REPORT_EVERY = 0
+    main.load_model()
+    await main.bot._async_setup_hook()
+    loop = asyncio.get_running_loop()
+    monitor = LoopMonitor(lambda: None, interval=0.01, stall=args.deadline, window=args.duration + 60)
+    monitor.start(loop)
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limit, per = parse_rate_limit(args.rate_limit)
+    guild = types.SimpleNamespace(id=1)
+    channels = [RateLimitedChannel(1000 + i, guild, limit, per, recorder) for i in range(args.channels)]
+    outsiders = [RateLimitedChannel(9000 + i, guild, limit, per, recorder) for i in range(max(1, args.channels // 10))]
+    author = types.SimpleNamespace(bot=False, id=42)
+
+    index = main.trigger_index.get_index(guild.id)
+    corpus = synthetic_corpus(index.data, 5000, seed=args.seed)
+    total = int(args.rate * args.duration)
+    # Everything about the injected traffic, including which messages deserve a reply, is
+    # decided up front on a private index, so neither the event loop nor the bot's caches
+    # see any of that work.
+    reference = TriggerIndex(copy.deepcopy(index.data), index.version, index.guild_id)
+    # With MATCH_EXECUTOR=process the bot itself has no model loaded.
+    nlp = main.nlp if main.nlp is not None else matcher.load_nlp_or_regex()
+    answered = {content: bool(matcher.match(content, reference, nlp)) for content in set(corpus)}
+    matcher.TOKEN_CACHE.clear()
+    plan = []
+    for _ in range(total):
+        allowed = rng.random() > 0.05
+        channel = rng.choice(channels if allowed else outsiders)
+        content = rng.choice(corpus)
+        plan.append((channel, content, allowed and answered[content]))
+    expected = {}
+
+    send_response = main.send_response
+
+    async def tagged_send_response(message, response, *args):
+        tagged = types.SimpleNamespace(**{**vars(message), "channel": ReplyChannel(message.channel, message.id)})
+        await send_response(tagged, response, *args)
+
+    main.send_response = tagged_send_response
+
+    # Injection is paced against the wall clock, so time lost to the handlers is made up
+    # on the next tick instead of lowering the achieved rate.
+    tick = 0.01
+    injected = 0
+    started = time.perf_counter()
+    while injected < total:
+        due = min(total, int((time.perf_counter() - started) * args.rate) + 1)
+        while injected < due:
+            channel, content, wants_reply = plan[injected]
+            message = types.SimpleNamespace(content=content, channel=channel, guild=guild, author=author, id=injected)
+            if wants_reply:
+                expected[channel.id] = expected.get(channel.id, 0) + 1
+                recorder.expect(injected, time.perf_counter())
+            main.bot.dispatch("message", message)
+            injected += 1
+        await asyncio.sleep(tick)
+    inject_elapsed = time.perf_counter() - started
+
+    # Let queued replies drain, up to the drain timeout.
+    drain_deadline = time.perf_counter() + args.drain
+    while time.perf_counter() < drain_deadline:
+        if sum(len(r) for r in recorder.replies.values()) >= sum(expected.values()):
+            break
+        await asyncio.sleep(0.05)
+
+    latencies = [sent - queued for replies in recorder.replies.values() for queued, sent, _ in replies if queued is not None]
+    expected_total = sum(expected.values())
+    sent_total = sum(len(r) for r in recorder.replies.values())
+    lags = monitor.lag_samples()
+    return {
+        "injected": injected,
+        "inject_rate": injected / inject_elapsed if inject_elapsed else 0.0,
+        "channels": args.channels,
+        "expected_replies": expected_total,
+        "sent_replies": sent_total,
+        "dropped_replies": max(0, expected_total - sent_total),
+        "delayed_replies": sum(1 for latency in latencies if latency > args.deadline),
+        "rate_limited_sends": recorder.rate_limited,
+        "reply_latency_ms": {
+            "p50": percentile(latencies, 0.5) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "loop_lag_ms": {
+            "p50": percentile(lags, 0.5) * 1000,
+            "p99": percentile(lags, 0.99) * 1000,
+            "max": max(lags, default=0.0) * 1000,
+        },
+        "loop_stalls": monitor.stalls,
+        "match_pool_dropped": main.MATCH_POOL.dropped,
+        "send_dropped": main.OUTBOUND.dropped_stale + main.OUTBOUND.dropped_full if main.OUTBOUND is not None else 0,
+        "batch_dropped": main.MESSAGE_BATCHER.dropped if main.MESSAGE_BATCHER is not None else 0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test of on_message.")
+    parser.add_argument("--rate", type=float, default=1000, help="messages injected per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of injection")
+    parser.add_argument("--channels", type=int, default=50, help="allow-listed channels to spread messages over")
+    parser.add_argument("--rate-limit", default="5/5", help="per-channel send limit, COUNT/SECONDS")
+    parser.add_argument("--deadline", type=float, default=2.0, help="replies slower than this many seconds count as delayed")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for queued replies after injection")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Work on a copy of the configuration so the allow-list can cover the fake channels.
+    workdir = tempfile.mkdtemp(prefix="autoresponder-loadtest-")
+    try:
+        config = os.path.join(workdir, "triggers.json")
+        build_config(config, [1000 + i for i in range(args.channels)])
+        os.environ["TRIGGERS_FILE"] = config
+        os.environ["TRIGGER_BACKEND"] = "json"
+        # Every expected reply should be sent, so responder cooldowns stay out of the way.
+        os.environ["RESPONSE_COOLDOWN"] = "0"
+        os.environ.setdefault("RENDER", "1")
+        result = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
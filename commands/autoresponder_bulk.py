@@ -0,0 +1,243 @@
+import csv
+import discord
+import io
+import json
+import math
+import os
+from discord import app_commands
+from discord.ext import commands
+from dotenv import load_dotenv
+from trigger_store import load_triggers, run_write, upsert_responders
+
+load_dotenv()
+
+ROLE_IDS = [int(role_id.strip()) for role_id in os.getenv("ROLE_IDS", "").split(",") if role_id.strip()]
+
+IMPORT_MAX_BYTES = 2 * 1024 * 1024
+# Errors beyond this many are counted but not listed.
+REPORT_ERRORS = 15
+REPORT_NAMES = 20
+CSV_FIELDS = ["category", "triggers", "response", "smart_detection", "cooldown", "cooldown_per_user"]
+
+class BulkImportError(Exception):
+    pass
+
+def _parse_bool(value, field):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("yes", "true", "1"):
+        return True
+    if text in ("no", "false", "0"):
+        return False
+    raise ValueError(f"`{field}` must be yes or no")
+
+def _records_from_json(text):
+    data = json.loads(text)
+    # Either an export / triggers.json ({"responses": {name: {...}}}) or a plain list of entries.
+    if isinstance(data, dict):
+        responses = data.get("responses", data)
+        if not isinstance(responses, dict):
+            raise BulkImportError("`responses` must map each autoresponder name to its settings.")
+        for name, value in responses.items():
+            if not isinstance(value, dict):
+                yield {"category": name, "_invalid": "entry must be an object"}
+                continue
+            yield {"category": value.get("category", name), **{k: v for k, v in value.items() if k != "category"}}
+    elif isinstance(data, list):
+        for value in data:
+            yield value if isinstance(value, dict) else {"_invalid": "entry must be an object"}
+    else:
+        raise BulkImportError("The JSON file must hold an object or a list of autoresponders.")
+
+def _records_from_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"category", "triggers", "response"} - set(reader.fieldnames or ())
+    if missing:
+        raise BulkImportError(f"The CSV header is missing: {', '.join(sorted(missing))}.")
+    for row in reader:
+        yield {key: value for key, value in row.items() if key is not None and value not in (None, "")}
+
+def validate_record(record):
+    # Returns (category, responder) in the same shape CreateAutoresponderModal writes.
+    if "_invalid" in record:
+        raise ValueError(record["_invalid"])
+    category = record.get("category", "")
+    if not isinstance(category, str):
+        raise ValueError("`category` must be text")
+    category = category.strip()
+    if not 1 <= len(category) <= 100:
+        raise ValueError("`category` must be 1-100 characters")
+
+    triggers = record.get("triggers", [])
+    if isinstance(triggers, str):
+        triggers = triggers.split(",")
+    if not isinstance(triggers, list):
+        raise ValueError("`triggers` must be a list or a comma-separated string")
+    trigger_list = [str(trigger).strip().lower() for trigger in triggers if str(trigger).strip()]
+    if not trigger_list:
+        raise ValueError("at least one trigger is required")
+
+    response = record.get("response")
+    if not isinstance(response, str) or not response.strip():
+        raise ValueError("`response` is required")
+    if len(response) > 2000:
+        raise ValueError("`response` is longer than 2000 characters")
+
+    responder = {
+        "triggers": trigger_list,
+        "category": category,
+        "response": response,
+        "smart_detection": _parse_bool(record.get("smart_detection", True), "smart_detection"),
+        "created_by_command": True
+    }
+    if "cooldown" in record:
+        try:
+            cooldown = float(record["cooldown"])
+        except (TypeError, ValueError):
+            raise ValueError("`cooldown` must be a number of seconds")
+        if not math.isfinite(cooldown):
+            raise ValueError("`cooldown` must be a finite number of seconds")
+        if cooldown < 0:
+            raise ValueError("`cooldown` cannot be negative")
+        responder["cooldown"] = cooldown
+    if "cooldown_per_user" in record:
+        responder["cooldown_per_user"] = _parse_bool(record["cooldown_per_user"], "cooldown_per_user")
+    return category, responder
+
+def plan_import(records, existing):
+    # Validates the whole batch against the current responders without writing anything.
+    plan = {"added": {}, "updated": {}, "unchanged": [], "errors": []}
+    seen = set()
+    for number, record in enumerate(records, 1):
+        label = f"#{number}"
+        try:
+            category, responder = validate_record(record)
+            label = f"#{number} `{category}`"
+            if category in seen:
+                raise ValueError("appears more than once in the file")
+            seen.add(category)
+            current = existing.get(category)
+            if current is not None and current.get("created_by_command") is not True:
+                raise ValueError("is defined in triggers.json and cannot be replaced by an import")
+        except ValueError as e:
+            plan["errors"].append(f"{label}: {e}")
+            continue
+        if current is None:
+            plan["added"][category] = responder
+        elif {**current, **responder} == current:
+            plan["unchanged"].append(category)
+        else:
+            plan["updated"][category] = {**current, **responder}
+    return plan
+
+def export_responders(responses, fmt):
+    created = {name: value for name, value in responses.items() if value.get("created_by_command") is True}
+    if fmt == "json":
+        return json.dumps({"responses": created}, ensure_ascii=False, indent=4).encode("utf-8")
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for name, value in created.items():
+        writer.writerow({
+            "category": value.get("category", name),
+            "triggers": ", ".join(value.get("triggers", [])),
+            "response": value.get("response", ""),
+            "smart_detection": "yes" if value.get("smart_detection", True) else "no",
+            "cooldown": value.get("cooldown", ""),
+            "cooldown_per_user": "" if "cooldown_per_user" not in value else ("yes" if value["cooldown_per_user"] else "no"),
+        })
+    return out.getvalue().encode("utf-8")
+
+def _names(names):
+    names = list(names)
+    shown = ", ".join(f"`{name}`" for name in names[:REPORT_NAMES])
+    if len(names) > REPORT_NAMES:
+        shown += f" and {len(names) - REPORT_NAMES} more"
+    return shown[:1024] or "None"
+
+def report_embed(plan, dry_run, color):
+    if plan["errors"]:
+        title = "❌ Import rejected, nothing was changed"
+    elif dry_run:
+        title = "🔍 Import dry run, nothing was changed"
+    else:
+        title = "✅ Import applied"
+    embed = discord.Embed(title=title, color=color)
+    embed.add_field(name=f"Added ({len(plan['added'])})", value=_names(plan["added"]), inline=False)
+    embed.add_field(name=f"Updated ({len(plan['updated'])})", value=_names(plan["updated"]), inline=False)
+    embed.add_field(name=f"Unchanged ({len(plan['unchanged'])})", value=_names(plan["unchanged"]), inline=False)
+    if plan["errors"]:
+        errors = "\n".join(plan["errors"][:REPORT_ERRORS])
+        if len(plan["errors"]) > REPORT_ERRORS:
+            errors += f"\n…and {len(plan['errors']) - REPORT_ERRORS} more"
+        embed.add_field(name=f"Errors ({len(plan['errors'])})", value=errors[:1024], inline=False)
+    return embed
+
+class AutoresponderBulk(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(
+        name="autoresponder-import",
+        description="Adds or updates autoresponders from a JSON or CSV file."
+    )
+    @app_commands.describe(
+        file="A JSON or CSV file, e.g. one made by /autoresponder-export",
+        dry_run="Only report what would change"
+    )
+    async def autoresponder_import(self, interaction: discord.Interaction, file: discord.Attachment, dry_run: bool = False):
+        if not any(role.id in ROLE_IDS for role in interaction.user.roles):
+            await interaction.response.send_message(
+                "❌ You do not have the required role to use this command.", ephemeral=True
+            )
+            return
+        if file.size > IMPORT_MAX_BYTES:
+            await interaction.response.send_message(
+                f"❌ The file is larger than {IMPORT_MAX_BYTES // 1024} KiB.", ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        try:
+            text = (await file.read()).decode("utf-8-sig")
+            if file.filename.lower().endswith(".csv"):
+                records = _records_from_csv(text)
+            else:
+                records = _records_from_json(text)
+            triggers_data = load_triggers(interaction.guild_id)
+            plan = plan_import(records, triggers_data.get("responses", {}))
+        except (BulkImportError, UnicodeDecodeError, json.JSONDecodeError, csv.Error) as e:
+            await interaction.followup.send(f"❌ Could not read `{file.filename}`: {e}", ephemeral=True)
+            return
+
+        if not plan["errors"] and not dry_run and (plan["added"] or plan["updated"]):
+            # One write and one index rebuild for the whole batch.
+            await run_write(upsert_responders, {**plan["added"], **plan["updated"]}, interaction.guild_id)
+        await interaction.followup.send(
+            embed=report_embed(plan, dry_run, triggers_data.get("embed_color", 0xFFFFFF)), ephemeral=True
+        )
+
+    @app_commands.command(
+        name="autoresponder-export",
+        description="Downloads the autoresponders created by command as a JSON or CSV file."
+    )
+    @app_commands.choices(format=[
+        app_commands.Choice(name="JSON", value="json"),
+        app_commands.Choice(name="CSV", value="csv"),
+    ])
+    async def autoresponder_export(self, interaction: discord.Interaction, format: str = "json"):
+        if not any(role.id in ROLE_IDS for role in interaction.user.roles):
+            await interaction.response.send_message(
+                "❌ You do not have the required role to use this command.", ephemeral=True
+            )
+            return
+
+        responses = load_triggers(interaction.guild_id).get("responses", {})
+        payload = export_responders(responses, format)
+        await interaction.response.send_message(
+            file=discord.File(io.BytesIO(payload), filename=f"autoresponders.{format}"), ephemeral=True
+        )
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AutoresponderBulk(bot))
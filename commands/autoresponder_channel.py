@@ -1,30 +1,14 @@
 import discord
-import json
 import os
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
+from trigger_store import load_triggers, run_write, update_settings
 
 load_dotenv()
 
 ROLE_IDS = [int(role_id) for role_id in os.getenv("ROLE_IDS", "").split(",") if role_id.strip()]
 
-def load_triggers():
-    try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        data = {}
-    if "embed_color" not in data:
-        data["embed_color"] = 0xFFFFFF
-    if "channel_ids" not in data:
-        data["channel_ids"] = []
-    return data
-
-def save_triggers(data):
-    with open("triggers.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
 class EchoMessageModal(discord.ui.Modal, title="Echo Message"):
     def __init__(self, channel_id: int, guild: discord.Guild):
         super().__init__()
@@ -79,9 +63,7 @@ class ColorModal(discord.ui.Modal, title="Set Embed Color"):
         color_str = self.color_input.value.strip().replace("#", "")
         try:
             self.color_value = int(color_str, 16)
-            triggers = load_triggers()
-            triggers["embed_color"] = self.color_value
-            save_triggers(triggers)
+            await run_write(update_settings, interaction.guild_id, embed_color=self.color_value)
             await interaction.response.send_message(f"✅ Color set to #{self.color_value:06X}", ephemeral=True)
         except ValueError:
             await interaction.response.send_message("❌ Invalid hex color code.", ephemeral=True)
@@ -100,7 +82,7 @@ class ConfigView(discord.ui.View):
         discord.SelectOption(label="Send Echo Message", description="Echo a message to a channel as the bot", value="echo")
     ])
     async def config_select(self, interaction: discord.Interaction, select: discord.ui.Select):
-        triggers = load_triggers()
+        triggers = load_triggers(interaction.guild_id)
         option = select.values[0]
         if option == "channel1":
             view = ChannelSelectView(interaction.guild)
@@ -118,16 +100,14 @@ class ConfigView(discord.ui.View):
             modal = ColorModal()
             await interaction.response.send_modal(modal)
             if getattr(modal, 'color_value', None) is not None:
-                triggers = load_triggers()
-                triggers['embed_color'] = modal.color_value
-                save_triggers(triggers)
+                await run_write(update_settings, interaction.guild_id, embed_color=modal.color_value)
         elif option == "echo":
             view = ChannelSelectView(interaction.guild, for_echo=True)
             await interaction.response.send_message("Select a channel to send the echo message:", view=view, ephemeral=True)
 
     @discord.ui.button(label="Save", style=discord.ButtonStyle.success, emoji="💾")
     async def save_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        triggers = load_triggers()
+        triggers = load_triggers(interaction.guild_id)
         changes = False
         channel_ids = triggers.get("channel_ids", [None, None])
         while len(channel_ids) < 2: channel_ids.append(None)
@@ -135,7 +115,7 @@ class ConfigView(discord.ui.View):
         if self.channel2: channel_ids[1] = self.channel2.id; changes = True
         triggers["channel_ids"] = [cid for cid in channel_ids if cid]
         if changes:
-            save_triggers(triggers)
+            await run_write(update_settings, interaction.guild_id, channel_ids=triggers["channel_ids"])
         embed_color = triggers.get("embed_color", 0xFFFFFF)
         embed = discord.Embed(title="✅ Configuration Saved" if changes else "⚠️ No changes detected", description="Your configuration has been updated." if changes else "No configuration changes.", color=embed_color)
         mentions = [interaction.guild.get_channel(cid).mention for cid in triggers.get("channel_ids", []) if interaction.guild.get_channel(cid)]
@@ -156,7 +136,7 @@ class AutoresponderChannel(commands.Cog):
         if not any(role.id in ROLE_IDS for role in interaction.user.roles):
             await interaction.response.send_message("❌ You do not have the required role.", ephemeral=True)
             return
-        triggers = load_triggers()
+        triggers = load_triggers(interaction.guild_id)
         embed_color = triggers.get("embed_color", 0xFFFFFF)
         embed = discord.Embed(title="Autoresponder settings", description="Use the dropdown to configure settings.", color=embed_color)
         chans = [interaction.guild.get_channel(cid).mention for cid in triggers.get("channel_ids", []) if interaction.guild.get_channel(cid)]
@@ -1,32 +1,15 @@
 import discord
-import json
 import os
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
+from trigger_store import load_triggers, run_write, upsert_responder
 
 load_dotenv()
 
 # Load multiple role IDs from .env (split them by commas)
 ROLE_IDS = [int(role_id) for role_id in os.getenv("ROLE_IDS", "").split(",")]
 
-def load_triggers():
-    try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        data = {}
-    
-    # Ensure embed_color exists
-    if "embed_color" not in data:
-        data["embed_color"] = 0xFFFFFF
-    
-    return data
-
-def save_triggers(data):
-    with open("triggers.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
 class CreateAutoresponderModal(discord.ui.Modal, title="Create New Autoresponder"):
     def __init__(self):
         super().__init__()
@@ -67,7 +50,7 @@ class CreateAutoresponderModal(discord.ui.Modal, title="Create New Autoresponder
         self.add_item(self.smart_detection)
 
     async def on_submit(self, interaction: discord.Interaction):
-        triggers_data = load_triggers()
+        triggers_data = load_triggers(interaction.guild_id)
         responses = triggers_data.get("responses", {})
 
         # Validate smart detection input
@@ -107,9 +90,7 @@ class CreateAutoresponderModal(discord.ui.Modal, title="Create New Autoresponder
             "created_by_command": True
         }
         
-        responses[category_name] = new_response
-        triggers_data["responses"] = responses
-        save_triggers(triggers_data)
+        await run_write(upsert_responder, category_name, new_response, interaction.guild_id)
 
         # Load embed color from triggers data
         embed_color = triggers_data.get("embed_color", 0xFFFFFF)
@@ -1,26 +1,16 @@
 import discord
-import json
 import os
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
+from trigger_index import category_choices
+from trigger_store import load_triggers, run_write, upsert_responder
 
 load_dotenv()
 
 # Load multiple role IDs from .env (split them by commas)
 ROLE_IDS = [int(role_id) for role_id in os.getenv("ROLE_IDS", "").split(",")]
 
-def load_triggers():
-    try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def save_triggers(data):
-    with open("triggers.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
 class EditAutoresponderModal(discord.ui.Modal, title="Edit Autoresponder"):
     def __init__(self, bot, category: str, response: str, triggers: list, smart_detection: bool):
         super().__init__()
@@ -53,7 +43,7 @@ class EditAutoresponderModal(discord.ui.Modal, title="Edit Autoresponder"):
         self.add_item(self.smart_detection)
 
     async def on_submit(self, interaction: discord.Interaction):
-        data = load_triggers()
+        data = load_triggers(interaction.guild_id)
 
         if self.category not in data.get("responses", {}):
             await interaction.response.send_message(
@@ -76,7 +66,7 @@ class EditAutoresponderModal(discord.ui.Modal, title="Edit Autoresponder"):
             trigger.strip().lower() for trigger in self.triggers.value.split(",")
         ]
         data["responses"][self.category]["smart_detection"] = (smart_detection_value == "yes")
-        save_triggers(data)
+        await run_write(upsert_responder, self.category, data["responses"][self.category], interaction.guild_id)
 
         await interaction.response.send_message(
             f"Autoresponder `{self.category}` updated successfully!",
@@ -98,7 +88,7 @@ class AutoresponderEdit(commands.Cog):
             )
             return
         
-        data = load_triggers()
+        data = load_triggers(interaction.guild_id)
         if category not in data.get("responses", {}):
             await interaction.response.send_message(
                 f"No autoresponder category found with name `{category}`.",
@@ -119,15 +109,7 @@ class AutoresponderEdit(commands.Cog):
 
     @autoresponder_edit.autocomplete("category")
     async def autoresponder_edit_autocomplete(self, interaction: discord.Interaction, current: str):
-        data = load_triggers()
-        responses = data.get("responses", {})
-        # Use the same filtering as in your delete command:
-        valid_categories = [
-            cat for cat, info in responses.items()
-            if info.get("created_by_command") is True and 1 <= len(cat) <= 100
-        ]
-        filtered = [cat for cat in valid_categories if current.lower() in cat.lower()]
-        return [app_commands.Choice(name=cat, value=cat) for cat in filtered[:25]]
+        return [app_commands.Choice(name=cat, value=cat) for cat in category_choices(interaction.guild_id, current)]
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AutoresponderEdit(bot))
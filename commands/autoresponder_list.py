@@ -1,46 +1,122 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from main import load_triggers  # Import only load_triggers
+from trigger_index import get_index
+
+# Discord allows 25 fields and 6000 characters per embed; pages stay well inside both.
+PAGE_FIELDS = 10
+PAGE_CHARS = 5000
+FIELD_NAME_CHARS = 256
+FIELD_VALUE_CHARS = 1024
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def _fields(responses):
+    for category, data in responses.items():
+        if data.get("created_by_command") is not True:
+            continue
+        triggers_list = data.get("triggers", [])
+        triggers_str = ", ".join(triggers_list) if triggers_list else "None"
+        response_text = data.get("response", "No response provided")
+        yield (
+            _truncate(f"Category: {category}", FIELD_NAME_CHARS),
+            _truncate(f"Triggers: {triggers_str}\nResponse: {response_text}", FIELD_VALUE_CHARS),
+        )
+
+def render_pages(index):
+    pages = [[]]
+    size = 0
+    for name, value in _fields(index.data.get("responses", {})):
+        if pages[-1] and (len(pages[-1]) >= PAGE_FIELDS or size + len(name) + len(value) > PAGE_CHARS):
+            pages.append([])
+            size = 0
+        pages[-1].append((name, value))
+        size += len(name) + len(value)
+
+    embeds = []
+    for number, fields in enumerate(pages, 1):
+        embed = discord.Embed(title="Autoresponder List", color=index.embed_color)
+        if not fields:
+            embed.add_field(
+                name="No autoresponders found",
+                value="There are no autoresponders created by command.",
+                inline=False
+            )
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=False)
+        if len(pages) > 1:
+            embed.set_footer(text=f"Page {number}/{len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+class ListPaginator(discord.ui.View):
+    def __init__(self, pages, user_id: int):
+        super().__init__(timeout=180)
+        self.pages = pages
+        self.user_id = user_id
+        self.page = 0
+        self.message = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page == len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Run `/autoresponder-list` yourself to browse the list.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = max(0, min(page, len(self.pages) - 1))
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.page], view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
 
 class AutoresponderList(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # (guild key, config version) -> rendered pages; Embeds are only read when sent.
+        self._pages = {}
+
+    def pages_for(self, guild_id):
+        index = get_index(guild_id)
+        key = (index.guild_id, index.version)
+        pages = self._pages.get(key)
+        if pages is None:
+            self._pages = {k: v for k, v in self._pages.items() if k[1] == index.version}
+            pages = self._pages[key] = render_pages(index)
+        return pages
 
     @app_commands.command(
-        name="autoresponder-list", 
+        name="autoresponder-list",
         description="Lists all autoresponders created by command."
     )
     async def autoresponder_list(self, interaction: discord.Interaction):
-        triggers_data = load_triggers()
-        embed_color = triggers_data.get("embed_color", 0xFFFFFF)
-        responses = triggers_data.get("responses", {})
+        pages = self.pages_for(interaction.guild_id)
+        if len(pages) == 1:
+            await interaction.response.send_message(embed=pages[0])
+            return
 
-        embed = discord.Embed(title="Autoresponder List", color=embed_color)
-
-        created_responses = {
-            cat: data for cat, data in responses.items()
-            if data.get("created_by_command") is True
-        }
-
-        if not created_responses:
-            embed.add_field(
-                name="No autoresponders found", 
-                value="There are no autoresponders created by command.", 
-                inline=False
-            )
-        else:
-            for category, data in created_responses.items():
-                triggers_list = data.get("triggers", [])
-                triggers_str = ", ".join(triggers_list) if triggers_list else "None"
-                response_text = data.get("response", "No response provided")
-                embed.add_field(
-                    name=f"Category: {category}",
-                    value=f"Triggers: {triggers_str}\nResponse: {response_text}",
-                    inline=False
-                )
-
-        await interaction.response.send_message(embed=embed)
+        view = ListPaginator(pages, interaction.user.id)
+        await interaction.response.send_message(embed=pages[0], view=view)
+        view.message = await interaction.original_response()
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AutoresponderList(bot))
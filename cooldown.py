@@ -0,0 +1,51 @@
+import os
+import time
+from collections import OrderedDict
+
+# Seconds during which a responder stays quiet in a channel after it answered there.
+# A responder's own "cooldown" in triggers.json overrides this; 0 disables it.
+RESPONSE_COOLDOWN = float(os.getenv("RESPONSE_COOLDOWN", "30"))
+# COOLDOWN_PER_USER=1 keys the window by user too, so only the same person repeating
+# themselves is suppressed. Responders can set "cooldown_per_user" to override it.
+COOLDOWN_PER_USER = os.getenv("COOLDOWN_PER_USER", "0") == "1"
+COOLDOWN_MAX_ENTRIES = int(os.getenv("COOLDOWN_MAX_ENTRIES", "10000"))
+
+class ResponseCooldown:
+    # Remembers when each (channel, responder[, user]) last got a reply. Entries expire
+    # after their window and the least recently used ones are evicted past max_entries.
+
+    def __init__(self, max_entries=COOLDOWN_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.suppressed = 0
+        self.evicted = 0
+        self._expires = OrderedDict()
+
+    def __len__(self):
+        return len(self._expires)
+
+    def claim(self, key, window):
+        # Starts the window and returns when it ends, or None if key is already cooling down.
+        if window <= 0:
+            return 0.0
+        now = self.clock()
+        expires = self._expires.get(key)
+        if expires is not None and expires > now:
+            self.suppressed += 1
+            return None
+        expires = self._expires[key] = now + window
+        self._expires.move_to_end(key)
+        while len(self._expires) > self.max_entries:
+            self._expires.popitem(last=False)
+            self.evicted += 1
+        return expires
+
+    def release(self, key, expires):
+        # Gives back a window whose reply was never delivered, unless a newer claim replaced it.
+        if self._expires.get(key) == expires:
+            del self._expires[key]
+
+    def key(self, message, responder):
+        window = RESPONSE_COOLDOWN if responder.cooldown is None else responder.cooldown
+        per_user = COOLDOWN_PER_USER if responder.cooldown_per_user is None else responder.cooldown_per_user
+        return (message.channel.id, responder.name, message.author.id if per_user else None), window
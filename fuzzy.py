@@ -0,0 +1,67 @@
+import difflib
+from collections import Counter
+from analysis_cache import FUZZY, FUZZY_CACHE_SIZE, MISSING, LRUCache
+
+SIMILARITY_THRESHOLD = 0.8
+
+class FuzzyIndex:
+    # Finds every trigger whose difflib ratio against a token exceeds the threshold.
+    # Candidates are narrowed by length and by a shared-character count, both of which
+    # are upper bounds on SequenceMatcher.ratio(), so decisions match a full pairwise scan.
+
+    def __init__(self, entries, threshold=SIMILARITY_THRESHOLD, cache_size=FUZZY_CACHE_SIZE):
+        self.threshold = threshold
+        self._cache = LRUCache(cache_size, FUZZY)
+        owners = {}
+        for trigger, owner in entries:
+            owners.setdefault(trigger, set()).add(owner)
+        self._triggers = list(owners)
+        self._owners = [frozenset(owners[t]) for t in self._triggers]
+        self._lengths = sorted({len(t) for t in self._triggers})
+        # char -> length -> [(trigger_id, count)]
+        self._postings = {}
+        for tid, trigger in enumerate(self._triggers):
+            for ch, count in Counter(trigger).items():
+                self._postings.setdefault(ch, {}).setdefault(len(trigger), []).append((tid, count))
+
+    def __len__(self):
+        return len(self._triggers)
+
+    def _passes(self, matches, total):
+        ratio = 2.0 * matches / total if total else 1.0
+        return ratio > self.threshold
+
+    def _search(self, token):
+        la = len(token)
+        lengths = [lb for lb in self._lengths if self._passes(min(la, lb), la + lb)]
+        if not lengths:
+            return frozenset()
+        if not token:
+            return frozenset().union(*(owners for trigger, owners in zip(self._triggers, self._owners) if not trigger))
+
+        overlap = {}
+        for ch, n in Counter(token).items():
+            by_length = self._postings.get(ch)
+            if not by_length:
+                continue
+            for lb in lengths:
+                for tid, m in by_length.get(lb, ()):
+                    overlap[tid] = overlap.get(tid, 0) + min(n, m)
+
+        found = set()
+        for tid, shared in overlap.items():
+            if self._owners[tid] <= found:
+                continue
+            trigger = self._triggers[tid]
+            if not self._passes(shared, la + len(trigger)):
+                continue
+            if difflib.SequenceMatcher(None, token, trigger).ratio() > self.threshold:
+                found |= self._owners[tid]
+        return frozenset(found)
+
+    def match(self, token):
+        owners = self._cache.get(token)
+        if owners is MISSING:
+            owners = self._search(token)
+            self._cache.put(token, owners)
+        return owners
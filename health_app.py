@@ -0,0 +1,32 @@
+# Lightweight HTTP app for gunicorn workers when the bot runs in its own process.
+# It must not import discord, spaCy or main; everything comes from the status socket.
+from flask import Flask, jsonify
+from status_channel import read_metrics, read_status
+
+app = Flask(__name__)
+
+@app.route("/")
+def home():
+    return "I'm alive!"
+
+@app.route("/health")
+def health():
+    status = read_status()
+    if status is None:
+        return jsonify({"status": "unhealthy", "error": "bot process unreachable"}), 503
+    health = status.get("health", {"status": "unhealthy"})
+    return jsonify(health), 503 if health["status"] == "unhealthy" else 200
+
+@app.route("/metrics")
+def metrics_endpoint():
+    text = read_metrics()
+    if text is None:
+        return "# bot process unreachable\n", 503, {"Content-Type": "text/plain; charset=utf-8"}
+    return text, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route("/status")
+def status():
+    status = read_status()
+    if status is None:
+        return jsonify({"state": "unreachable"}), 503
+    return jsonify(status)
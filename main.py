@@ -1,28 +1,40 @@
 # main.py
+import time
+_phase_started = time.perf_counter()
+
 import discord
-import json
 import os
-import spacy
-import difflib
 from discord.ext import commands
 from discord import app_commands
 from dotenv import load_dotenv
-from flask import Flask
-from threading import Thread
+from flask import Flask, jsonify
+from threading import Event, Lock, Thread
 import asyncio
+import analysis_cache
+import batching
+import cooldown
+import matcher
+import metrics
+import outbound
+import prefilter
+import status_channel
+import trigger_index
+import watchdog
+import workers
 
 load_dotenv()
 
-def get_embed_color():
-    try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("embed_color", 0xFFFFFF)
-    except Exception:
-        return 0xFFFFFF
+def log_phase(name):
+    global _phase_started
+    now = time.perf_counter()
+    print(f"Startup: {name} took {now - _phase_started:.2f}s")
+    _phase_started = now
 
-EMBED_COLOR_HEX = get_embed_color()
 IS_RENDER = os.getenv("RENDER") is not None
+# SEPARATE_BOT_PROCESS=1: this process only runs the bot and publishes its status on a Unix
+# socket; gunicorn serves HTTP from health_app with any number of workers.
+SEPARATE_BOT_PROCESS = os.getenv("SEPARATE_BOT_PROCESS", "0") == "1"
+STARTED_AT = time.time()
 
 app = Flask(__name__)
 
@@ -32,82 +44,107 @@ def home():
 
 @app.route("/health")
 def health():
-    return "OK", 200
+    state, details = LOOP_MONITOR.health()
+    return jsonify({"status": state, **details}), 503 if state == "unhealthy" else 200
+
+@app.route("/status")
+def status():
+    return jsonify(bot_status())
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 def run_dev():
     app.run(host="0.0.0.0", port=8080)
 
-if not IS_RENDER:
-    server = Thread(target=run_dev)
-    server.daemon = True
-    server.start()
-
 TOKEN = os.getenv("DISCORD_TOKEN")
 ROLE_IDS = [int(role_id.strip()) for role_id in os.getenv("ROLE_IDS", "").split(",") if role_id.strip()]
-nlp = spacy.load("en_core_web_sm")
+# AUTO_SHARD=1 spreads gateway load across shards; SHARD_COUNT pins the count instead of asking Discord.
+AUTO_SHARD = os.getenv("AUTO_SHARD", "0") == "1"
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+MATCH_POOL = workers.MatchPool()
+# Loaded in the background by launch(); the bot does not connect until MODEL_READY is set.
+nlp = None
+MODEL_READY = Event()
+# Set if warming up failed even after falling back to the regex tokenizer; the bot then stays offline.
+MODEL_FAILED = False
 
-def load_triggers():
-    try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {}
+intents = discord.Intents.default()
+intents.message_content = True
+if AUTO_SHARD:
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
 
-    if "responses" not in data:
-        data["responses"] = {}
-    if "question_words" not in data:
-        data["question_words"] = []
-    if "force" not in data:
-        data["force"] = {}
+def bot_status():
+    if bot.is_closed():
+        state = "disconnected"
+    elif bot.is_ready():
+        state = "ready"
+    else:
+        state = "starting"
+    health_state, health_details = LOOP_MONITOR.health()
+    return {
+        "state": state,
+        "health": {"status": health_state, **health_details},
+        "pid": os.getpid(),
+        "started_at": STARTED_AT,
+        "model_ready": MODEL_READY.is_set() and not MODEL_FAILED,
+        "latency": bot.latency if bot.is_ready() else None,
+        "guilds": len(bot.guilds),
+        "trigger_version": trigger_index.get_index().version,
+        "send_queue_depth": OUTBOUND.depth if OUTBOUND is not None else 0,
+    }
 
-    for key, value in data.get("responses", {}).items():
-        if "smart_detection" not in value:
-            value["smart_detection"] = True
+LOOP_MONITOR = watchdog.LoopMonitor(lambda: bot.latency if bot.is_ready() else None)
 
-    return data
+def record_result(index, response):
+    if response:
+        metrics.MATCHES.inc(index.labels.get(response, "unknown"))
+    else:
+        metrics.MISSES.inc()
 
-def save_triggers(triggers_data):
-    with open("triggers.json", "w", encoding="utf-8") as f:
-        json.dump(triggers_data, f, ensure_ascii=False, indent=4)
+COOLDOWN = cooldown.ResponseCooldown()
 
-TRIGGERS_DATA = load_triggers()
-QUESTION_START = set(TRIGGERS_DATA.get("question_words", []))
+def keep_cooldown():
+    pass
 
-def refresh_triggers():
-    global TRIGGERS_DATA, QUESTION_START, EMBED_COLOR_HEX
-    TRIGGERS_DATA = load_triggers()
-    QUESTION_START = set(TRIGGERS_DATA.get("question_words", []))
-    EMBED_COLOR_HEX = get_embed_color()
+def claim_cooldown(message, index, response):
+    # None when the same responder already answered here within its cooldown window;
+    # otherwise a callback that gives the window back if the reply is never delivered.
+    responder = index.by_response.get(response)
+    if responder is None:
+        return keep_cooldown
+    key, window = COOLDOWN.key(message, responder)
+    expires = COOLDOWN.claim(key, window)
+    if expires is None:
+        metrics.SUPPRESSED.inc(responder.label)
+        return None
+    return lambda: COOLDOWN.release(key, expires)
 
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+async def deliver(channel, response, waited=0.0):
+    metrics.STAGE_SECONDS.observe(waited, "send_queue")
+    started = time.perf_counter()
+    try:
+        await channel.send(response)
+    finally:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "send")
+
+OUTBOUND = outbound.OutboundQueue(deliver) if outbound.OUTBOUND_QUEUE else None
 
-def get_response(message):
-    doc = nlp(message.content.lower())
+async def send_response(message, response, release=keep_cooldown):
+    if OUTBOUND is not None:
+        OUTBOUND.submit(message.channel, response, on_drop=release)
+        return
     try:
-        with open("triggers.json", "r", encoding="utf-8") as f:
-            triggers_data = json.load(f)
+        await deliver(message.channel, response)
     except Exception:
-        triggers_data = {}
-
-    for autoresponder_name, data in triggers_data.get("responses", {}).items():
-        triggers = set(data.get("triggers", []))
-        smart_detection = data.get("smart_detection", True)
+        release()
+        raise
 
-        if not smart_detection:
-            if any(trigger in message.content.lower().split() for trigger in triggers):
-                return data.get("response", autoresponder_name)
-        else:
-            question_words_in_message = any(token.text in QUESTION_START for token in doc)
-            trigger_matches = sum(
-                1 for token in doc if any(
-                    difflib.SequenceMatcher(None, token.text, trigger).ratio() > 0.8
-                    for trigger in triggers)
-            )
-            if question_words_in_message and trigger_matches > 0:
-                return data.get("response", autoresponder_name)
-    return None
+def guild_index(message):
+    return trigger_index.get_index(message.guild.id if message.guild else None)
 
 @bot.event
 async def on_ready():
@@ -120,20 +157,93 @@ async def on_ready():
     print(f"Logged in as {bot.user}")
     print(f"Environment: {'Render (Production)' if IS_RENDER else 'Local (Development)'}")
 
+@bot.event
+async def on_connect():
+    LOOP_MONITOR.connected = True
+
+@bot.event
+async def on_resumed():
+    LOOP_MONITOR.connected = True
+
+@bot.event
+async def on_disconnect():
+    LOOP_MONITOR.connected = False
+
 @bot.event
 async def on_message(message):
     if message.author.bot:
         return
 
-    refresh_triggers()
+    started = time.perf_counter()
+    index = guild_index(message)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "guild_index")
 
-    channel_ids = TRIGGERS_DATA.get("channel_ids", [])
+    channel_ids = index.channel_ids
     if channel_ids and message.channel.id not in channel_ids:
         return
 
-    response = get_response(message)
-    if response:
-        await message.channel.send(response)
+    metrics.MESSAGES.inc()
+    if MESSAGE_BATCHER is not None:
+        MESSAGE_BATCHER.submit(message)
+        return
+
+    started = time.perf_counter()
+    response = await MATCH_POOL.match(message.content, index, nlp)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "match")
+    record_result(index, response)
+    release = claim_cooldown(message, index, response) if response else None
+    if release is not None:
+        await send_response(message, response, release)
+
+async def process_message_batch(messages):
+    by_guild = {}
+    for message in messages:
+        by_guild.setdefault(message.guild.id if message.guild else None, []).append(message)
+    responses = {}
+    for guild_id, group in by_guild.items():
+        index = trigger_index.get_index(guild_id)
+        started = time.perf_counter()
+        matched = await MATCH_POOL.match_many([message.content for message in group], index, nlp)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "match_batch")
+        for response in matched:
+            record_result(index, response)
+        for message, response in zip(group, matched):
+            release = claim_cooldown(message, index, response) if response else None
+            responses[id(message)] = (response, release) if release is not None else None
+
+    for message in messages:
+        if responses[id(message)] is None:
+            continue
+        response, release = responses[id(message)]
+        try:
+            await send_response(message, response, release)
+        except Exception as e:
+            print(f"Failed to send response in channel {message.channel.id}: {e}")
+
+MESSAGE_BATCHER = batching.MessageBatcher(process_message_batch) if batching.MESSAGE_BATCHING else None
+
+metrics.Callback("autoresponder_loop_lag_seconds", "Worst event-loop scheduling lag over the watchdog window.", lambda: LOOP_MONITOR.max_lag)
+metrics.Callback("autoresponder_loop_stalls_total", "Times the event loop was caught blocked.", lambda: LOOP_MONITOR.stalls, "counter")
+metrics.Callback("autoresponder_trigger_reloads_total", "Times the compiled trigger index was rebuilt.", trigger_index.reload_count, "counter")
+metrics.Callback("autoresponder_store_writes_total", "Configuration writes flushed by the trigger store.", lambda: trigger_index.STORE.writes, "counter")
+metrics.Callback("autoresponder_match_in_flight", "Messages currently being matched in the worker pool.", lambda: MATCH_POOL.in_flight)
+metrics.Callback("autoresponder_match_dropped_total", "Messages skipped because the worker pool queue was full.", lambda: MATCH_POOL.dropped, "counter")
+metrics.Callback("autoresponder_match_timeouts_total", "Messages whose matching exceeded MATCH_TIMEOUT.", lambda: MATCH_POOL.timed_out, "counter")
+metrics.Callback("autoresponder_cooldown_entries", "Channel/responder pairs currently tracked for cooldowns.", lambda: len(COOLDOWN))
+metrics.Callback("autoresponder_prefilter_checked_total", "Messages checked by the prefilter.", lambda: prefilter.STATS.checked, "counter")
+metrics.Callback("autoresponder_prefilter_rejected_total", "Messages answered without tokenization.", lambda: prefilter.STATS.rejected, "counter")
+for stats in analysis_cache.ALL_STATS:
+    metrics.Callback(f"autoresponder_{stats.name}_cache_hits_total", f"Lookups answered by the {stats.name} cache.", lambda stats=stats: stats.hits, "counter")
+    metrics.Callback(f"autoresponder_{stats.name}_cache_misses_total", f"Lookups the {stats.name} cache could not answer.", lambda stats=stats: stats.misses, "counter")
+    metrics.Callback(f"autoresponder_{stats.name}_cache_hit_ratio", f"Share of {stats.name} cache lookups that hit.", lambda stats=stats: stats.hit_rate)
+if OUTBOUND is not None:
+    metrics.Callback("autoresponder_send_queue_depth", "Replies waiting in the outbound queue.", lambda: OUTBOUND.depth)
+    metrics.Callback("autoresponder_send_queue_channels", "Channels with replies waiting in the outbound queue.", lambda: OUTBOUND.channels)
+    metrics.Callback("autoresponder_send_failed_total", "Replies that Discord rejected.", lambda: OUTBOUND.failed, "counter")
+    metrics.Callback("autoresponder_send_dropped_total", "Replies dropped for going stale or overflowing their channel's queue.", lambda: OUTBOUND.dropped_stale + OUTBOUND.dropped_full, "counter")
+if MESSAGE_BATCHER is not None:
+    metrics.Callback("autoresponder_batch_queue_depth", "Messages waiting in the batching queue.", lambda: MESSAGE_BATCHER.depth)
+    metrics.Callback("autoresponder_batch_dropped_total", "Messages shed by the batching queue.", lambda: MESSAGE_BATCHER.dropped, "counter")
 
 EXTENSIONS = [
     "commands.autoresponder_list",
@@ -141,25 +251,73 @@ EXTENSIONS = [
     "commands.autoresponder_edit",
     "commands.autoresponder_delete",
     "commands.autoresponder_channel",
+    "commands.autoresponder_bulk",
 ]
 
+def load_model():
+    global nlp, MODEL_FAILED
+    try:
+        started = time.perf_counter()
+        index = trigger_index.get_index()
+        if MATCH_POOL.needs_local_model:
+            nlp = matcher.load_nlp_or_regex()
+            print(f"Startup: model load took {time.perf_counter() - started:.2f}s")
+            warm_started = time.perf_counter()
+            matcher.match("when is the update coming out?", index, nlp)
+        else:
+            warm_started = time.perf_counter()
+            MATCH_POOL.warm_up(index)
+        print(f"Startup: model warm-up took {time.perf_counter() - warm_started:.2f}s")
+    except Exception as e:
+        MODEL_FAILED = True
+        print(f"Failed to load the matching model, the bot will not connect: {e}")
+    finally:
+        MODEL_READY.set()
+
 async def start_bot():
     for ext in EXTENSIONS:
         try:
             await bot.load_extension(ext)
         except Exception as e:
             print(f"Failed to load extension {ext}: {e}")
-    try:
-        await bot.wait_until_ready()
-        await bot.tree.sync()
-        print("All slash commands synced")
-    except Exception as e:
-        print(f"Error syncing slash commands: {e}")
+    log_phase("extension loading")
+    # Slash commands are synced in on_ready; the gateway connection waits for a warm model.
+    await asyncio.get_running_loop().run_in_executor(None, MODEL_READY.wait)
+    log_phase("waiting for the model")
+    if MODEL_FAILED:
+        return
+    LOOP_MONITOR.start(asyncio.get_running_loop())
     await bot.start(TOKEN)
 
 def run_bot_thread():
-    thread = Thread(target=lambda: asyncio.run(start_bot()))
+    thread = Thread(target=lambda: asyncio.run(start_bot()), name="discord-bot")
     thread.daemon = False
     thread.start()
+    return thread
+
+BOT_THREAD = None
+_launched = False
+_launch_lock = Lock()
+
+def launch():
+    # Starts the HTTP server, the model load and the bot once per process, however often
+    # this module is imported or launch() is called.
+    global _launched, BOT_THREAD
+    with _launch_lock:
+        if _launched:
+            return
+        _launched = True
+    log_phase("imports and configuration")
+    if SEPARATE_BOT_PROCESS:
+        status_channel.StatusPublisher(bot_status, metrics_provider=metrics.render).start()
+    elif not IS_RENDER:
+        server = Thread(target=run_dev, name="http-dev-server")
+        server.daemon = True
+        server.start()
+    Thread(target=load_model, name="model-loader", daemon=True).start()
+    BOT_THREAD = run_bot_thread()
 
-run_bot_thread()
+if __name__ == "__main__":
+    launch()
+    # Executors refuse new work once the main thread has exited, so keep it alive.
+    BOT_THREAD.join()
@@ -0,0 +1,218 @@
+import os
+import re
+from collections import namedtuple
+from time import perf_counter
+from analysis_cache import MISSING, TOKEN_CACHE_SIZE, TOKENS, LRUCache
+from metrics import CONFIDENCE, STAGE_SECONDS
+from phrase_matcher import normalize
+from ranking import MATCH_STRATEGY, rank
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+# Matching only reads token.text, so the default loads nothing but the tokenizer.
+# Modes whose tokens carry lemmas declare it with "lemmas": True.
+NLP_MODE = os.getenv("NLP_MODE", "tokenizer").lower()
+NLP_MODES = {
+    "full": {"exclude": [], "lemmas": True},
+    "lemma": {"exclude": ["parser", "ner", "senter"], "lemmas": True},
+    "tokenizer": {"exclude": ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"], "lemmas": False},
+    # No spaCy at all; see regex_tokenize, which only approximates spaCy's tokenizer.
+    "regex": {"exclude": None, "lemmas": False},
+}
+
+RegexToken = namedtuple("RegexToken", ["text"])
+
+# Approximates the spaCy English tokenizer on lowercased chat text: contractions split the
+# same way ("can't" -> "ca", "n't"; "there's" -> "there", "'s"), URLs, emails, common
+# emoticons, clock times and short abbreviations stay whole, "5pm" splits into "5", "pm",
+# and other punctuation stands alone. Rarer spaCy exceptions are not reproduced, so token
+# streams (and occasionally decisions) can differ from the spaCy modes.
+_EMOTICONS = sorted([
+    ":)", ":(", ":-)", ":-(", ":))", ":((", ":p", ":-p", ":o", ":-o", ":/", ":-/", ":|", ":-|",
+    ":3", ":*", ":'(", ":')", ";)", ";-)", "=)", "=(", "=/", "<3", "</3", "^_^", "-_-", "o.o",
+], key=len, reverse=True)
+_TOKEN_RE = re.compile(r"""
+    https?://\S+
+    | [\w.+-]+@[\w-]+(?:\.[\w-]+)+
+    | (?<!\S)(?:""" + "|".join(map(re.escape, _EMOTICONS)) + r""")(?!\S)
+    | (?<!\w)(?:w/o|w/|e\.g\.|i\.e\.|vs\.)
+    | (?<!\w)y['’](?=all\b)
+    | (?<![\w.])[a-z](?:\.[a-z])+(?=\.?(?!\w))
+    | \d{1,2}:\d{2}(?!\d)
+    | \d+(?=[ap]m\b) | (?<=\d)[ap]m\b
+    | \d+(?:[.,]\d+)+
+    | \.{2,}
+    | \w+(?=n['’]t\b) | n['’]t\b
+    | ['’](?:s|re|ve|ll|d|m)\b
+    | \w+
+    | \S
+""", re.VERBOSE)
+
+# Apostrophe-less contractions that spaCy's tokenizer exceptions split.
+_CONTRACTIONS = {
+    "ive": ("i", "ve"), "im": ("i", "m"), "id": ("i", "d"), "youre": ("you", "re"), "youve": ("you", "ve"),
+    "theyre": ("they", "re"), "hes": ("he", "s"), "shes": ("she", "s"), "thats": ("that", "s"),
+    "theres": ("there", "s"), "whats": ("what", "s"), "whens": ("when", "s"), "wheres": ("where", "s"),
+    "hows": ("how", "s"), "whos": ("who", "s"), "dont": ("do", "nt"), "cant": ("ca", "nt"),
+    "wont": ("wo", "nt"), "didnt": ("did", "nt"), "doesnt": ("does", "nt"), "isnt": ("is", "nt"),
+    "arent": ("are", "nt"), "wasnt": ("was", "nt"), "werent": ("were", "nt"), "havent": ("have", "nt"),
+    "hasnt": ("has", "nt"), "couldnt": ("could", "nt"), "shouldnt": ("should", "nt"),
+    "wouldnt": ("would", "nt"), "gonna": ("gon", "na"), "gotta": ("got", "ta"),
+}
+
+def regex_tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        parts = _CONTRACTIONS.get(token)
+        if parts:
+            tokens.extend(RegexToken(part) for part in parts)
+        else:
+            tokens.append(RegexToken(token))
+    return tokens
+
+def load_nlp(mode=NLP_MODE):
+    if mode not in NLP_MODES:
+        raise ValueError(f"Unknown NLP_MODE {mode!r}, expected one of {', '.join(NLP_MODES)}")
+    if mode == "regex":
+        return regex_tokenize
+    import spacy
+    return spacy.load(SPACY_MODEL, exclude=NLP_MODES[mode]["exclude"])
+
+def load_nlp_or_regex(mode=NLP_MODE):
+    # A missing or broken spaCy model degrades to the regex tokenizer instead of leaving
+    # the bot without one.
+    try:
+        return load_nlp(mode)
+    except Exception as e:
+        if mode == "regex":
+            raise
+        print(f"Failed to load spaCy model {SPACY_MODEL!r} for NLP_MODE={mode}: {e}")
+        print("Falling back to NLP_MODE=regex; matching continues with the built-in tokenizer")
+        return regex_tokenize
+
+# (nlp, normalized text) -> token texts
+TOKEN_CACHE = LRUCache(TOKEN_CACHE_SIZE, TOKENS)
+
+def tokenize(text, nlp):
+    key = (id(nlp), text)
+    tokens = TOKEN_CACHE.get(key)
+    if tokens is MISSING:
+        tokens = tuple(token.text for token in nlp(text))
+        TOKEN_CACHE.put(key, tokens)
+    return tokens
+
+def _match_phrases(index, phrase_matches):
+    for position, responder in enumerate(index.responders):
+        if not responder.smart_detection and position in phrase_matches:
+            return responder.response
+    return None
+
+def _token_matches(index, tokens):
+    # Tokens whose normalized form is a trigger's are settled by a dict lookup; only the
+    # rest are scored fuzzily. The vector engine returns {position: confidence} instead.
+    found = set()
+    rest = []
+    for token in tokens:
+        owners = index.exact.match(token) if index.exact is not None else None
+        if owners:
+            found |= owners
+        elif index.vector is not None:
+            rest.append(token)
+        else:
+            found |= index.fuzzy.match(token)
+    if index.vector is None:
+        return found
+    return {**index.vector.owners(rest), **dict.fromkeys(found, 1.0)}
+
+def _match_tokens(index, phrase_matches, tokens):
+    question_words_in_message = any(token in index.question_words for token in tokens)
+    fuzzy_matches = None
+
+    for position, responder in enumerate(index.responders):
+        if not responder.smart_detection:
+            if position in phrase_matches:
+                return responder.response
+        elif question_words_in_message:
+            if position in phrase_matches:
+                return responder.response
+            if fuzzy_matches is None:
+                fuzzy_matches = _token_matches(index, tokens)
+            if position in fuzzy_matches:
+                if isinstance(fuzzy_matches, dict):
+                    CONFIDENCE.observe(fuzzy_matches[position])
+                return responder.response
+    return None
+
+def _decide(index, content, tokens):
+    if MATCH_STRATEGY == "best":
+        ranked = rank(index, content, tokens, k=1)
+        if not ranked:
+            return None
+        if ranked[0].similarity < 1.0:
+            CONFIDENCE.observe(ranked[0].similarity)
+        return ranked[0].responder.response
+    phrase_matches = index.phrases.owners(content)
+    if tokens is None:
+        return _match_phrases(index, phrase_matches)
+    return _match_tokens(index, phrase_matches, tokens)
+
+def match(content, index, nlp):
+    # Runs of whitespace never change a decision, so copies of a message that differ only
+    # in case or spacing share one cache entry.
+    started = perf_counter()
+    content = normalize(content)
+    response = index.decisions.get(content)
+    if response is not MISSING:
+        STAGE_SECONDS.observe(perf_counter() - started, "cache")
+        return response
+    if not index.prefilter.needs_tokens(content):
+        response = _decide(index, content, None)
+        STAGE_SECONDS.observe(perf_counter() - started, "prefilter")
+        index.decisions.put(content, response)
+        return response
+    parsed = perf_counter()
+    STAGE_SECONDS.observe(parsed - started, "prefilter")
+    tokens = tokenize(content, nlp)
+    scored = perf_counter()
+    STAGE_SECONDS.observe(scored - parsed, "tokenize")
+    response = _decide(index, content, tokens)
+    STAGE_SECONDS.observe(perf_counter() - scored, "score")
+    index.decisions.put(content, response)
+    return response
+
+def match_many(contents, index, nlp):
+    # Same decisions as match() for each content, but every message that still needs
+    # tokens after the caches is parsed in one nlp.pipe() call.
+    texts = [normalize(content) for content in contents]
+    decisions = {}
+    pending = []
+    for text in texts:
+        if text in decisions:
+            continue
+        response = index.decisions.get(text)
+        if response is MISSING:
+            pending.append(text)
+        decisions[text] = response
+
+    tokens = {}
+    to_parse = []
+    for text in pending:
+        if not index.prefilter.needs_tokens(text):
+            continue
+        cached = TOKEN_CACHE.get((id(nlp), text))
+        if cached is MISSING:
+            to_parse.append(text)
+        else:
+            tokens[text] = cached
+    if to_parse:
+        started = perf_counter()
+        docs = nlp.pipe(to_parse) if hasattr(nlp, "pipe") else map(nlp, to_parse)
+        for text, doc in zip(to_parse, docs):
+            tokens[text] = tuple(token.text for token in doc)
+            TOKEN_CACHE.put((id(nlp), text), tokens[text])
+        STAGE_SECONDS.observe(perf_counter() - started, "tokenize_batch")
+
+    for text in pending:
+        response = _decide(index, text, tokens.get(text))
+        decisions[text] = response
+        index.decisions.put(text, response)
+    return [decisions[text] for text in texts]
@@ -0,0 +1,96 @@
+# Minimal Prometheus text-format metrics. Recording is a dict lookup and a few integer
+# additions, so it stays cheap on the message path; rendering happens only on scrape.
+from bisect import bisect_left
+
+# Seconds; covers everything from a prefiltered miss to a rate-limited send.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REGISTRY = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Callback:
+    # A gauge or counter whose value is read from the owning object at scrape time.
+    def __init__(self, name, help, fn, type="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.type = type
+        REGISTRY.append(self)
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", f"{self.name} {value}"]
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+STAGE_SECONDS = Histogram("autoresponder_stage_seconds", "Time spent in each message pipeline stage.", ("stage",))
+MESSAGES = Counter("autoresponder_messages_total", "Messages that reached matching.")
+MATCHES = Counter("autoresponder_matches_total", "Messages answered, by responder.", ("responder",))
+MISSES = Counter("autoresponder_misses_total", "Messages that matched no responder.")
+CONFIDENCE = Histogram("autoresponder_match_confidence", "Similarity of winning fuzzy matches under the vector engine or best-match ranking.",
+                       buckets=(0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0))
+SUPPRESSED = Counter("autoresponder_suppressed_total", "Replies skipped because the responder was cooling down, by responder.", ("responder",))
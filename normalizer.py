@@ -0,0 +1,65 @@
+import os
+import re
+from functools import lru_cache
+
+# TOKEN_NORMALIZATION=0 turns off the exact lookup of normalized tokens, leaving fuzzy scoring alone.
+TOKEN_NORMALIZATION = os.getenv("TOKEN_NORMALIZATION", "1") == "1"
+
+_LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"})
+_NON_WORD = re.compile(r"[\W_]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+def _stem(word):
+    # Light suffix stripping; it only has to send a word and its variants to the same key.
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        word = word[:-3]
+    elif len(word) > 4 and word.endswith("ed"):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("es") and word[-3] in "sxz":
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s") and word[-2] not in "su":
+        word = word[:-1]
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+@lru_cache(maxsize=16384)
+def normalize_token(token):
+    # "Updates", "UPD4TE!", "updaaate" and "updating" all become "updat".
+    token = token.lower()
+    if any(ch.isalpha() for ch in token):
+        token = token.translate(_LEET)
+    token = _NON_WORD.sub("", token)
+    if not token or token.isdigit():
+        return token
+    return _REPEATS.sub(r"\1", _stem(token))
+
+def trigger_key(trigger):
+    # What counts as one distinct trigger: variants of a single word share a key.
+    words = trigger.lower().split()
+    if len(words) == 1:
+        return normalize_token(words[0]) or words[0]
+    return " ".join(words)
+
+class ExactIndex:
+    # Normalized single-word triggers -> owners, so most near-miss spellings are a dict
+    # lookup instead of a fuzzy search.
+
+    def __init__(self, entries):
+        owners = {}
+        for trigger, owner in entries:
+            if len(trigger.split()) != 1:
+                continue
+            key = normalize_token(trigger)
+            if key:
+                owners.setdefault(key, set()).add(owner)
+        self._owners = {key: frozenset(value) for key, value in owners.items()}
+
+    def __len__(self):
+        return len(self._owners)
+
+    def match(self, token):
+        key = normalize_token(token)
+        return self._owners.get(key) if key else None
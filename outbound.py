@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import os
+import time
+from collections import deque
+
+# OUTBOUND_QUEUE=0 sends replies inline from on_message instead of through the queue.
+OUTBOUND_QUEUE = os.getenv("OUTBOUND_QUEUE", "1") == "1"
+# Discord allows roughly 5 messages per 5 seconds in a channel.
+OUTBOUND_CHANNEL_LIMIT = int(os.getenv("OUTBOUND_CHANNEL_LIMIT", "5"))
+OUTBOUND_CHANNEL_PER = float(os.getenv("OUTBOUND_CHANNEL_PER", "5"))
+# Replies still queued after this many seconds are dropped; they would arrive out of context.
+OUTBOUND_DEADLINE = float(os.getenv("OUTBOUND_DEADLINE", "15"))
+OUTBOUND_MAX_DEPTH = int(os.getenv("OUTBOUND_MAX_DEPTH", "20"))
+OUTBOUND_CONCURRENCY = int(os.getenv("OUTBOUND_CONCURRENCY", "10"))
+
+class ChannelBucket:
+    # Sliding-window view of a channel's send rate limit.
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.blocked_until = 0.0
+        self._sent = deque(maxlen=limit)
+
+    def wait_time(self, now):
+        wait = self.blocked_until - now
+        if len(self._sent) >= self.limit:
+            wait = max(wait, self._sent[0] + self.per - now)
+        return max(wait, 0.0)
+
+    def take(self, now):
+        self._sent.append(now)
+
+    def block(self, now, seconds):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+class OutboundQueue:
+    # Per-channel reply queues drained by one dispatcher. Channels take turns, each has at
+    # most one send in flight (so replies keep their order), and a channel whose bucket is
+    # exhausted waits on a timer instead of holding up the others.
+
+    def __init__(self, send, limit=OUTBOUND_CHANNEL_LIMIT, per=OUTBOUND_CHANNEL_PER, deadline=OUTBOUND_DEADLINE,
+                 max_depth=OUTBOUND_MAX_DEPTH, concurrency=OUTBOUND_CONCURRENCY, clock=time.monotonic):
+        self.send = send
+        self.limit = limit
+        self.per = per
+        self.deadline = deadline
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.clock = clock
+        self.sent = 0
+        self.failed = 0
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self._queues = {}
+        self._buckets = {}
+        self._ready = deque()
+        self._delayed = []
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def channels(self):
+        return len(self._queues)
+
+    def submit(self, channel, content, on_drop=None):
+        # on_drop runs if the reply is dropped or its send fails, i.e. it never reached the channel.
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = deque()
+            self._ready.append(channel.id)
+        elif len(queue) >= self.max_depth:
+            # The oldest reply is the closest to going stale anyway.
+            self._dropped(queue.popleft())
+            self.dropped_full += 1
+        queue.append((channel, content, self.clock(), on_drop))
+        self._wakeup.set()
+        return True
+
+    def _dropped(self, item):
+        on_drop = item[3]
+        if on_drop is not None:
+            on_drop()
+
+    def _bucket(self, channel_id):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = ChannelBucket(self.limit, self.per)
+        return bucket
+
+    def _promote(self, now):
+        # Moves channels whose wait is over back into the rotation.
+        while self._delayed and self._delayed[0][0] <= now:
+            self._ready.append(heapq.heappop(self._delayed)[1])
+
+    def _next_channel(self, now):
+        while self._ready:
+            channel_id = self._ready.popleft()
+            queue = self._queues.get(channel_id)
+            if not queue:
+                continue
+            while queue and now - queue[0][2] > self.deadline:
+                self._dropped(queue.popleft())
+                self.dropped_stale += 1
+            if not queue:
+                del self._queues[channel_id]
+                continue
+            wait = self._bucket(channel_id).wait_time(now)
+            if wait > 0:
+                heapq.heappush(self._delayed, (now + wait, channel_id))
+                continue
+            return channel_id
+        return None
+
+    async def _run(self):
+        while True:
+            now = self.clock()
+            self._promote(now)
+            saturated = self._in_flight >= self.concurrency
+            channel_id = None if saturated else self._next_channel(now)
+            if channel_id is None:
+                self._wakeup.clear()
+                # With every slot busy only a finished send (which sets _wakeup) can help.
+                timeout = self._delayed[0][0] - now if self._delayed and not saturated else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            item = self._queues[channel_id].popleft()
+            self._bucket(channel_id).take(now)
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._deliver(channel_id, item))
+
+    async def _deliver(self, channel_id, item):
+        channel, content, queued_at, _ = item
+        try:
+            await self.send(channel, content, self.clock() - queued_at)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            self._dropped(item)
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after:
+                self._bucket(channel_id).block(self.clock(), retry_after)
+            print(f"Failed to send response in channel {channel_id}: {e}")
+        finally:
+            self._in_flight -= 1
+            if self._queues.get(channel_id):
+                self._ready.append(channel_id)
+            else:
+                self._queues.pop(channel_id, None)
+            self._wakeup.set()
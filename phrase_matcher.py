@@ -0,0 +1,88 @@
+from collections import deque
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+class PhraseMatcher:
+    # Aho-Corasick automaton over every trigger (single words and phrases alike).
+    # One pass over the normalized message reports each hit that sits on word boundaries.
+
+    def __init__(self, entries):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._patterns = []
+        self._owners = []
+        pattern_ids = {}
+        for trigger, owner in entries:
+            pattern = normalize(trigger)
+            if not pattern:
+                continue
+            pid = pattern_ids.get(pattern)
+            if pid is None:
+                pid = pattern_ids[pattern] = len(self._patterns)
+                self._patterns.append(pattern)
+                self._owners.append(set())
+                self._insert(pattern, pid)
+            self._owners[pid].add(owner)
+        self._owners = [frozenset(owners) for owners in self._owners]
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def _insert(self, pattern, pid):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pid)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text):
+        # Yields (start, end, pattern, owners) for every boundary-aligned hit in text.
+        text = normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            # Every pattern ending here ends in ch, so a hit that stops mid-word is rejected once for all of them.
+            if i < last and _is_word_char(ch) and _is_word_char(text[i + 1]):
+                continue
+            for pid in out[state]:
+                pattern = self._patterns[pid]
+                start = i - len(pattern) + 1
+                if start > 0 and _is_word_char(pattern[0]) and _is_word_char(text[start - 1]):
+                    continue
+                yield start, i + 1, pattern, self._owners[pid]
+
+    def owners(self, text):
+        found = set()
+        for _, _, _, owners in self.scan(text):
+            found |= owners
+        return frozenset(found)
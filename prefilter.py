@@ -0,0 +1,36 @@
+import os
+import re
+
+PREFILTER_REPORT_EVERY = int(os.getenv("PREFILTER_REPORT_EVERY", "1000"))
+
+class PrefilterStats:
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+
+    @property
+    def reject_rate(self):
+        return self.rejected / self.checked if self.checked else 0.0
+
+    def record(self, rejected):
+        self.checked += 1
+        if rejected:
+            self.rejected += 1
+        if PREFILTER_REPORT_EVERY and self.checked % PREFILTER_REPORT_EVERY == 0:
+            print(f"Prefilter: skipped tokenization for {self.rejected}/{self.checked} messages ({self.reject_rate:.1%})")
+
+STATS = PrefilterStats()
+
+class Prefilter:
+    # Smart-detection responders need a question word token, and every token is a substring
+    # of the message, so a message containing no question word as a substring can only be
+    # answered by fixed-mode phrase hits and never needs spaCy or fuzzy scoring.
+
+    def __init__(self, question_words, has_smart_responders):
+        words = sorted((w for w in question_words if w), key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, words))) if words and has_smart_responders else None
+
+    def needs_tokens(self, content):
+        needed = self._pattern is not None and self._pattern.search(content) is not None
+        STATS.record(not needed)
+        return needed
@@ -0,0 +1,95 @@
+import difflib
+import heapq
+import os
+from normalizer import normalize_token, trigger_key
+
+# "first" answers with the first responder in triggers.json order that passes; "best"
+# ranks every candidate and answers with the strongest one.
+MATCH_STRATEGY = os.getenv("MATCH_STRATEGY", "first").lower()
+RANK_TOP_K = int(os.getenv("RANK_TOP_K", "3"))
+
+if MATCH_STRATEGY not in ("first", "best"):
+    raise ValueError(f"Unknown MATCH_STRATEGY {MATCH_STRATEGY!r}, expected first or best")
+
+class Candidate:
+    __slots__ = ("position", "responder", "similarity", "words", "hits")
+
+    def __init__(self, position, responder):
+        self.position = position
+        self.responder = responder
+        self.similarity = 0.0
+        self.words = 0
+        self.hits = set()
+
+    def add(self, similarity, words, hit):
+        self.similarity = max(self.similarity, similarity)
+        self.words = max(self.words, words)
+        self.hits.add(hit)
+
+    @property
+    def coverage(self):
+        return len(self.hits) / len(self.responder.trigger_keys) if self.responder.trigger_keys else 0.0
+
+    def key(self):
+        # Similarity first, then the longest phrase that hit, then the share of the
+        # responder's triggers that hit; file order only breaks exact ties.
+        return (self.similarity, self.words, self.coverage, -self.position)
+
+def _length_bound(a, b):
+    # SequenceMatcher.ratio() can never exceed this.
+    return 2.0 * min(len(a), len(b)) / (len(a) + len(b)) if a or b else 1.0
+
+def _score_fuzzy(index, tokens, candidate):
+    if index.vector is not None:
+        for position, confidence in index.vector.owners(tokens).items():
+            candidate(position).add(confidence, 1, "vector")
+        return
+
+    by_position = {}
+    for token in set(tokens):
+        for position in index.fuzzy.match(token):
+            by_position.setdefault(position, []).append(token)
+    # Candidates are scored best bound first, and the rest are skipped as soon as their
+    # bound falls below the best similarity found so far.
+    bounded = sorted(
+        (max(_length_bound(token, trigger) for token in matched for trigger in index.responders[position].triggers), position, matched)
+        for position, matched in by_position.items()
+    )
+    best = 0.0
+    for bound, position, matched in reversed(bounded):
+        if bound < best:
+            break
+        similarity = max(
+            difflib.SequenceMatcher(None, token, trigger).ratio()
+            for token in matched for trigger in index.responders[position].triggers
+            if _length_bound(token, trigger) >= best
+        )
+        entry = candidate(position)
+        for token in matched:
+            entry.add(similarity, 1, trigger_key(token))
+        best = max(best, similarity)
+
+def rank(index, content, tokens, k=RANK_TOP_K):
+    # The top k candidates for normalized content, strongest first. tokens is None when
+    # the prefilter showed no smart responder can fire.
+    question_words_in_message = tokens is not None and any(token in index.question_words for token in tokens)
+    candidates = {}
+
+    def candidate(position):
+        entry = candidates.get(position)
+        if entry is None:
+            entry = candidates[position] = Candidate(position, index.responders[position])
+        return entry
+
+    for _, _, pattern, owners in index.phrases.scan(content):
+        for position in owners:
+            if question_words_in_message or not index.responders[position].smart_detection:
+                candidate(position).add(1.0, len(pattern.split()), trigger_key(pattern))
+    if question_words_in_message and index.exact is not None:
+        for token in tokens:
+            for position in index.exact.match(token) or ():
+                candidate(position).add(1.0, 1, normalize_token(token))
+    # Fuzzy hits always score below 1.0, so they cannot beat an exact hit.
+    if question_words_in_message and not candidates:
+        _score_fuzzy(index, tokens, candidate)
+    return heapq.nlargest(k, candidates.values(), key=Candidate.key)
@@ -0,0 +1,266 @@
+import copy
+import json
+import os
+import sqlite3
+import time
+from threading import RLock
+from trigger_store import RELOAD_CHECK_INTERVAL, _with_defaults
+
+# How many change-log rows to keep; readers further behind than this reload everything.
+CHANGE_LOG_LIMIT = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responders (
+    name TEXT PRIMARY KEY,
+    category TEXT,
+    response TEXT,
+    smart_detection INTEGER NOT NULL DEFAULT 1,
+    created_by_command INTEGER,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS responders_category ON responders(category);
+CREATE TABLE IF NOT EXISTS triggers (
+    responder TEXT NOT NULL REFERENCES responders(name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    trigger TEXT NOT NULL,
+    PRIMARY KEY (responder, position)
+);
+CREATE INDEX IF NOT EXISTS triggers_text ON triggers(trigger);
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    name TEXT
+);
+"""
+
+_RESPONDER_COLUMNS = ("triggers", "category", "response", "smart_detection", "created_by_command")
+
+class SqliteTriggerStore:
+    # Same interface as trigger_store.TriggerStore, backed by one row per responder.
+    # Other processes' commits are picked up by replaying the changes table, so only
+    # the responders that changed are read back.
+
+    def __init__(self, path, json_path=None):
+        self.path = path
+        self.version = 0
+        self.reloads = 0
+        self.writes = 0
+        self._lock = RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._data = None
+        self._revision = 0
+        self._data_version = None
+        self._checked_at = 0.0
+        if json_path and self._is_empty() and os.path.exists(json_path):
+            self.migrate_from_json(json_path)
+
+    def _is_empty(self):
+        row = self._conn.execute("SELECT (SELECT COUNT(*) FROM responders) + (SELECT COUNT(*) FROM settings)").fetchone()
+        return row[0] == 0
+
+    # Reading
+
+    def _read_responder(self, name):
+        row = self._conn.execute(
+            "SELECT category, response, smart_detection, created_by_command, extra FROM responders WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        category, response, smart_detection, created_by_command, extra = row
+        triggers = [t for (t,) in self._conn.execute("SELECT trigger FROM triggers WHERE responder = ? ORDER BY position", (name,))]
+        value = {"triggers": triggers}
+        if category is not None:
+            value["category"] = category
+        if response is not None:
+            value["response"] = response
+        value["smart_detection"] = bool(smart_detection)
+        if created_by_command is not None:
+            value["created_by_command"] = bool(created_by_command)
+        value.update(json.loads(extra))
+        return value
+
+    def _read_settings(self, data):
+        for key in [k for k in data if k not in ("responses", "channel_ids")]:
+            del data[key]
+        for key, value in self._conn.execute("SELECT key, value FROM settings"):
+            data[key] = json.loads(value)
+        data["channel_ids"] = [cid for (cid,) in self._conn.execute("SELECT channel_id FROM channels ORDER BY position")]
+
+    def _read_all(self):
+        data = {"responses": {}}
+        names = [name for (name,) in self._conn.execute("SELECT name FROM responders ORDER BY rowid")]
+        for name in names:
+            data["responses"][name] = self._read_responder(name)
+        self._read_settings(data)
+        return _with_defaults(data)
+
+    def _latest_revision(self):
+        return self._conn.execute("SELECT COALESCE(MAX(revision), 0) FROM changes").fetchone()[0]
+
+    def _apply_changes(self):
+        rows = self._conn.execute("SELECT revision, kind, name FROM changes WHERE revision > ? ORDER BY revision", (self._revision,)).fetchall()
+        if not rows:
+            return False
+        oldest = self._conn.execute("SELECT MIN(revision) FROM changes").fetchone()[0]
+        if oldest > self._revision + 1:
+            # The log was pruned past our position, so the replay would be incomplete.
+            self._data = self._read_all()
+            self._revision = rows[-1][0]
+            return True
+
+        data = copy.copy(self._data)
+        data["responses"] = dict(data["responses"])
+        for name in {name for _, kind, name in rows if kind == "responder"}:
+            value = self._read_responder(name)
+            if value is None:
+                data["responses"].pop(name, None)
+            else:
+                data["responses"][name] = value
+        if any(kind == "settings" for _, kind, _ in rows):
+            self._read_settings(data)
+            _with_defaults(data)
+        self._data = data
+        self._revision = rows[-1][0]
+        return True
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._data is not None and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = now
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data is None:
+                self._data = self._read_all()
+                self._revision = self._latest_revision()
+            elif not force and data_version == self._data_version:
+                return
+            elif not self._apply_changes():
+                self._data_version = data_version
+                return
+            self._data_version = data_version
+            self.version += 1
+            self.reloads += 1
+
+    def snapshot(self):
+        self.refresh()
+        with self._lock:
+            return self._data, self.version
+
+    def load(self):
+        data, _ = self.snapshot()
+        return copy.deepcopy(data)
+
+    # Writing
+
+    def _log(self, kind, name=None):
+        cur = self._conn.execute("INSERT INTO changes (kind, name) VALUES (?, ?)", (kind, name))
+        self._conn.execute("DELETE FROM changes WHERE revision <= ?", (cur.lastrowid - CHANGE_LOG_LIMIT,))
+        return cur.lastrowid
+
+    def _write_responder(self, name, value):
+        extra = {k: v for k, v in value.items() if k not in _RESPONDER_COLUMNS}
+        created_by_command = value.get("created_by_command")
+        self._conn.execute(
+            "INSERT INTO responders (name, category, response, smart_detection, created_by_command, extra) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET category = excluded.category, response = excluded.response, "
+            "smart_detection = excluded.smart_detection, created_by_command = excluded.created_by_command, extra = excluded.extra",
+            (name, value.get("category"), value.get("response"), int(value.get("smart_detection", True)),
+             None if created_by_command is None else int(created_by_command), json.dumps(extra, ensure_ascii=False)),
+        )
+        self._conn.execute("DELETE FROM triggers WHERE responder = ?", (name,))
+        self._conn.executemany(
+            "INSERT INTO triggers (responder, position, trigger) VALUES (?, ?, ?)",
+            [(name, position, trigger) for position, trigger in enumerate(value.get("triggers", []))],
+        )
+
+    def _write_settings(self, settings):
+        for key, value in settings.items():
+            if key == "responses":
+                continue
+            if key == "channel_ids":
+                self._conn.execute("DELETE FROM channels")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO channels (channel_id, position) VALUES (?, ?)",
+                    [(cid, position) for position, cid in enumerate(value)],
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, json.dumps(value, ensure_ascii=False)),
+                )
+
+    def _commit(self, write):
+        # Runs write() in one transaction and applies the result to the in-memory copy.
+        with self._lock:
+            self.refresh(force=True)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                write()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._apply_changes()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self.version += 1
+            self.writes += 1
+
+    def upsert_responder(self, name, value):
+        def write():
+            self._write_responder(name, value)
+            self._log("responder", name)
+        self._commit(write)
+
+    def upsert_responders(self, responders):
+        def write():
+            for name, value in responders.items():
+                self._write_responder(name, value)
+                self._log("responder", name)
+        self._commit(write)
+
+    def delete_responder(self, name):
+        def write():
+            self._conn.execute("DELETE FROM responders WHERE name = ?", (name,))
+            self._log("responder", name)
+        self._commit(write)
+
+    def update_settings(self, **settings):
+        def write():
+            self._write_settings(settings)
+            self._log("settings")
+        self._commit(write)
+
+    def migrate_from_json(self, json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        def write():
+            for name, value in data.get("responses", {}).items():
+                self._write_responder(name, value)
+                self._log("responder", name)
+            self._write_settings({k: v for k, v in data.items() if k != "responses"})
+            self._log("settings")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            write()
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        print(f"Migrated {len(data.get('responses', {}))} autoresponders from {json_path} to {self.path}")
+
+    def flush(self):
+        # Every write is committed immediately; nothing is buffered.
+        pass
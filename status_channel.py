@@ -0,0 +1,93 @@
+import json
+import os
+import socket
+import socketserver
+from threading import Thread
+
+# Unix socket through which the bot process publishes its status to HTTP workers.
+STATUS_SOCKET = os.getenv("STATUS_SOCKET", "/tmp/autoresponder-status.sock")
+STATUS_TIMEOUT = float(os.getenv("STATUS_TIMEOUT", "0.5"))
+
+class StatusPublisher:
+    # Each connection sends one request line: "status" is answered with one JSON document
+    # from provider(), "metrics" with the Prometheus text from metrics_provider().
+
+    def __init__(self, provider, path=STATUS_SOCKET, metrics_provider=None):
+        self.provider = provider
+        self.metrics_provider = metrics_provider
+        self.path = path
+        self._server = None
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        provider = self.provider
+        metrics_provider = self.metrics_provider
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = STATUS_TIMEOUT
+
+            def handle(self):
+                try:
+                    request = self.rfile.readline(64).decode("ascii", "replace").strip()
+                except OSError:
+                    return
+                if request == "metrics":
+                    try:
+                        text = metrics_provider() if metrics_provider is not None else ""
+                    except Exception as e:
+                        text = f"# metrics unavailable: {e}\n"
+                    self.wfile.write(text.encode("utf-8"))
+                    return
+                try:
+                    payload = provider()
+                except Exception as e:
+                    payload = {"state": "error", "error": str(e)}
+                self.wfile.write(json.dumps(payload).encode("utf-8"))
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        Thread(target=self._server.serve_forever, name="status-publisher", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+def _request(request, path, timeout):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(request.encode("ascii") + b"\n")
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+    return b"".join(chunks)
+
+def read_status(path=STATUS_SOCKET, timeout=STATUS_TIMEOUT):
+    # Returns the bot's status document, or None if the bot process is not reachable.
+    payload = _request("status", path, timeout)
+    if payload is None:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def read_metrics(path=STATUS_SOCKET, timeout=STATUS_TIMEOUT):
+    # Returns the bot's rendered /metrics text, or None if the bot process is not reachable.
+    payload = _request("metrics", path, timeout)
+    return None if payload is None else payload.decode("utf-8", "replace")
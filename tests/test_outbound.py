@@ -0,0 +1,46 @@
+import asyncio
+import time
+import types
+import unittest
+
+from outbound import OutboundQueue
+
+class CountingClock:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return time.monotonic()
+
+class OutboundQueueTest(unittest.TestCase):
+    def test_saturated_queue_does_not_spin(self):
+        # Regression: with every slot busy and a rate-limited channel already due, the
+        # dispatcher used to wait_for with a timeout <= 0 and spin on the event loop.
+        clock = CountingClock()
+        sent = []
+
+        async def send(channel, content, waited):
+            if channel.id != 1:
+                await asyncio.sleep(1.5)
+            sent.append(content)
+
+        async def scenario():
+            queue = OutboundQueue(send, limit=1, per=0.5, deadline=10, max_depth=10, concurrency=2, clock=clock)
+            limited, slow, other = (types.SimpleNamespace(id=i) for i in (1, 2, 3))
+            queue.submit(slow, "b0")
+            queue.submit(limited, "a0")
+            queue.submit(limited, "a1")
+            await asyncio.sleep(0.1)
+            # Fills the slot a0 freed while a1 waits out channel 1's rate limit.
+            queue.submit(other, "c0")
+            await asyncio.sleep(2.5)
+            return queue
+
+        queue = asyncio.run(scenario())
+        self.assertEqual(sorted(sent), ["a0", "a1", "b0", "c0"])
+        self.assertEqual(queue.sent, 4)
+        self.assertLess(clock.calls, 100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from threading import Lock
+from analysis_cache import DECISION_CACHE_SIZE, DECISIONS, LRUCache
+from fuzzy import FuzzyIndex
+from normalizer import TOKEN_NORMALIZATION, ExactIndex, trigger_key
+from phrase_matcher import PhraseMatcher
+from prefilter import Prefilter
+from vector_scoring import VECTOR_ENABLED, VectorScorer
+from trigger_store import STORE, guild_config
+
+class Responder:
+    __slots__ = ("name", "label", "response", "triggers", "trigger_keys", "smart_detection", "cooldown", "cooldown_per_user")
+
+    def __init__(self, name, data):
+        self.name = name
+        # Short name for logs and metrics; legacy responders are keyed by their full response text.
+        self.label = data.get("category") or name[:40]
+        self.response = data.get("response", name)
+        self.triggers = frozenset(data.get("triggers", []))
+        self.trigger_keys = frozenset(trigger_key(trigger) for trigger in self.triggers)
+        self.smart_detection = data.get("smart_detection", True)
+        # None falls back to the RESPONSE_COOLDOWN / COOLDOWN_PER_USER defaults.
+        self.cooldown = data.get("cooldown")
+        self.cooldown_per_user = data.get("cooldown_per_user")
+
+AUTOCOMPLETE_LIMIT = 25
+
+class CategoryIndex:
+    # Names of command-created responders for the edit/delete autocomplete. Prefix and
+    # substring lookups are both bisects: one over the sorted names, one over every
+    # suffix of every name.
+
+    def __init__(self, names, limit=AUTOCOMPLETE_LIMIT):
+        self.limit = limit
+        self.names = list(names)
+        self._prefixes = sorted((name.lower(), name) for name in self.names)
+        self._suffixes = sorted(
+            (lowered[i:], name)
+            for lowered, name in self._prefixes
+            for i in range(1, len(lowered))
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _starting_with(self, entries, text):
+        i = bisect_left(entries, (text,))
+        while i < len(entries) and entries[i][0].startswith(text):
+            yield entries[i][1]
+            i += 1
+
+    def search(self, current):
+        # Names starting with current come first, then names containing it elsewhere.
+        text = current.lower()
+        if not text:
+            return self.names[:self.limit]
+        found = {}
+        for name in self._starting_with(self._prefixes, text):
+            found[name] = None
+            if len(found) >= self.limit:
+                return list(found)
+        for name in self._starting_with(self._suffixes, text):
+            found[name] = None
+            if len(found) >= self.limit:
+                break
+        return list(found)
+
+# Settings the compiled matching structures are built from; a guild that overrides none
+# of them shares the compiled triggers of the top-level config.
+COMPILED_SETTINGS = ("responses", "question_words")
+
+class CompiledTriggers:
+    def __init__(self, data):
+        self.data = data
+        self.responders = [Responder(name, value) for name, value in data.get("responses", {}).items()]
+        self.question_words = frozenset(data.get("question_words", []))
+        self.by_response = {responder.response: responder for responder in reversed(self.responders)}
+        self.labels = {response: responder.label for response, responder in self.by_response.items()}
+        smart_triggers = [
+            (trigger, position)
+            for position, responder in enumerate(self.responders) if responder.smart_detection
+            for trigger in responder.triggers
+        ]
+        self.fuzzy = FuzzyIndex(smart_triggers)
+        self.exact = ExactIndex(smart_triggers) if TOKEN_NORMALIZATION else None
+        self.vector = VectorScorer(smart_triggers, len(self.responders)) if VECTOR_ENABLED else None
+        self.phrases = PhraseMatcher(
+            (trigger, position)
+            for position, responder in enumerate(self.responders)
+            for trigger in responder.triggers
+        )
+        self.prefilter = Prefilter(self.question_words, any(r.smart_detection for r in self.responders))
+        self._categories = None
+        # Normalized message text -> response; dropped with the index when the config changes.
+        self.decisions = LRUCache(DECISION_CACHE_SIZE, DECISIONS)
+
+    @property
+    def categories(self):
+        # Built on first use; matching workers never need it.
+        if self._categories is None:
+            self._categories = CategoryIndex(
+                name for name, value in self.data.get("responses", {}).items()
+                if value.get("created_by_command") is True and 1 <= len(name) <= 100
+            )
+        return self._categories
+
+class TriggerIndex:
+    # A guild's view of the config: its own channel_ids and embed_color over compiled
+    # triggers that may be shared with other guilds.
+
+    def __init__(self, data, version=0, guild_id=None, compiled=None):
+        self.data = data
+        self.version = version
+        self.guild_id = guild_id
+        self.channel_ids = frozenset(data.get("channel_ids", []))
+        self.embed_color = data.get("embed_color", 0xFFFFFF)
+        self.compiled = compiled if compiled is not None else CompiledTriggers(data)
+
+    def __getattr__(self, name):
+        # responders, fuzzy, decisions, categories, ... live on the compiled triggers.
+        if name == "compiled":
+            raise AttributeError(name)
+        return getattr(self.compiled, name)
+
+class TriggerCache:
+    # One view per guild with its own entry under "guilds" (plus one for everyone else),
+    # but compiled triggers only per distinct responder set: guilds that override just
+    # channel_ids or embed_color share the top-level ones. Everything is built on first
+    # use and dropped when the store's version moves on.
+
+    def __init__(self, store=STORE):
+        self.store = store
+        self.reloads = 0
+        self._lock = Lock()
+        self._version = None
+        self._indexes = {}
+        self._compiled = {}
+
+    def invalidate(self):
+        # Re-read the file now; used by processes that do not own the store's writes.
+        self.store.refresh(force=True)
+
+    def get(self, guild_id=None):
+        data, version = self.store.snapshot()
+        guild = data.get("guilds", {}).get(str(guild_id)) if guild_id is not None else None
+        key = guild_id if guild else None
+        index = self._indexes.get(key)
+        if index is not None and index.version == version:
+            return index
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                self._indexes = {}
+                self._compiled = {}
+            index = self._indexes.get(key)
+            if index is None:
+                compiled_key = key if guild and any(setting in guild for setting in COMPILED_SETTINGS) else None
+                compiled = self._compiled.get(compiled_key)
+                if compiled is None:
+                    self.reloads += 1
+                    compiled = self._compiled[compiled_key] = CompiledTriggers(guild_config(data, compiled_key))
+                index = self._indexes[key] = TriggerIndex(guild_config(data, key), version, key, compiled)
+            return index
+
+    def __len__(self):
+        return len(self._indexes)
+
+_cache = TriggerCache()
+
+def get_index(guild_id=None):
+    return _cache.get(guild_id)
+
+def category_choices(guild_id, current):
+    # Autocomplete for the edit/delete commands, served from the compiled index so it is
+    # only rebuilt when the configuration changes.
+    return get_index(guild_id).categories.search(current)
+
+def invalidate():
+    _cache.invalidate()
+
+def reload_count():
+    return _cache.reloads
@@ -0,0 +1,258 @@
+import asyncio
+import atexit
+import copy
+import functools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock, Lock, Timer
+
+TRIGGERS_FILE = os.getenv("TRIGGERS_FILE", "triggers.json")
+# "json" keeps everything in TRIGGERS_FILE; "sqlite" uses TRIGGERS_DB, migrating TRIGGERS_FILE into it on first run.
+TRIGGER_BACKEND = os.getenv("TRIGGER_BACKEND", "json").lower()
+TRIGGERS_DB = os.getenv("TRIGGERS_DB", "triggers.db")
+# Edits made within this many seconds of each other are written to disk once.
+STORE_FLUSH_DELAY = float(os.getenv("STORE_FLUSH_DELAY", "0.5"))
+# Minimum seconds between stat() calls that look for hand edits to the file.
+RELOAD_CHECK_INTERVAL = float(os.getenv("TRIGGERS_RELOAD_INTERVAL", "1.0"))
+
+def _with_defaults(data):
+    if "responses" not in data:
+        data["responses"] = {}
+    if "question_words" not in data:
+        data["question_words"] = []
+    if "force" not in data:
+        data["force"] = {}
+    if "channel_ids" not in data:
+        data["channel_ids"] = []
+    if "embed_color" not in data:
+        data["embed_color"] = 0xFFFFFF
+
+    for key, value in data.get("responses", {}).items():
+        if "smart_detection" not in value:
+            value["smart_detection"] = True
+
+    return data
+
+class TriggerStore:
+    def __init__(self, path=TRIGGERS_FILE, flush_delay=STORE_FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.version = 0
+        self.reloads = 0
+        self.writes = 0
+        self._lock = RLock()
+        self._write_lock = Lock()
+        self._data = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._dirty = False
+        self._timer = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        return _with_defaults(data)
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._data is not None and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = now
+            # Unflushed edits are newer than whatever is on disk.
+            if self._dirty:
+                return
+            signature = self._stat_signature()
+            if force or self._data is None or signature != self._signature:
+                self._data = self._read_file()
+                self._signature = signature
+                self.version += 1
+                self.reloads += 1
+
+    def snapshot(self):
+        # The returned data is shared with every other reader and must not be mutated.
+        self.refresh()
+        with self._lock:
+            return self._data, self.version
+
+    def load(self):
+        data, _ = self.snapshot()
+        return copy.deepcopy(data)
+
+    def save(self, data):
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._data = data
+            self.version += 1
+            self._dirty = True
+            if self._timer is None:
+                self._timer = Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def upsert_responder(self, name, value):
+        with self._lock:
+            data = self.load()
+            data["responses"][name] = value
+            self.save(data)
+
+    def upsert_responders(self, responders):
+        # Many responders, one version bump and one write.
+        with self._lock:
+            data = self.load()
+            data["responses"].update(responders)
+            self.save(data)
+
+    def delete_responder(self, name):
+        with self._lock:
+            data = self.load()
+            data["responses"].pop(name, None)
+            self.save(data)
+
+    def update_settings(self, **settings):
+        with self._lock:
+            data = self.load()
+            data.update(settings)
+            self.save(data)
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                data = self._data
+                self._dirty = False
+            try:
+                self._write_atomic(data)
+            except OSError as e:
+                print(f"Failed to write {self.path}, will retry: {e}")
+                with self._lock:
+                    if self._data is data:
+                        self._dirty = True
+                    if self._dirty and self._timer is None:
+                        self._timer = Timer(self.flush_delay, self.flush)
+                        self._timer.daemon = True
+                        self._timer.start()
+                return
+            with self._lock:
+                self._signature = self._stat_signature()
+                self.writes += 1
+
+    def _write_atomic(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".triggers-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                try:
+                    os.fchmod(f.fileno(), os.stat(self.path).st_mode & 0o777)
+                except FileNotFoundError:
+                    pass
+                json.dump(data, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+# Settings a guild always keeps for itself once it configures them through a command.
+# A guild answers from the top-level "responses" until a command first adds, edits or
+# deletes an autoresponder there; that write copies the set into the guild's entry, and
+# from then on the guild's changes stay its own (and top-level edits no longer reach it).
+GUILD_SCOPED_SETTINGS = ("channel_ids", "responses")
+
+def guild_config(data, guild_id):
+    # Top-level settings overlaid with the guild's own entry under "guilds", if it has one.
+    guild = data.get("guilds", {}).get(str(guild_id)) if guild_id is not None else None
+    if not guild:
+        return data
+    merged = {key: value for key, value in data.items() if key != "guilds"}
+    merged.update(guild)
+    return merged
+
+def _open_store():
+    if TRIGGER_BACKEND == "sqlite":
+        from sqlite_store import SqliteTriggerStore
+        return SqliteTriggerStore(TRIGGERS_DB, json_path=TRIGGERS_FILE)
+    if TRIGGER_BACKEND != "json":
+        raise ValueError(f"Unknown TRIGGER_BACKEND {TRIGGER_BACKEND!r}, expected json or sqlite")
+    return TriggerStore()
+
+STORE = _open_store()
+atexit.register(STORE.flush)
+
+def load_triggers(guild_id=None):
+    data, _ = STORE.snapshot()
+    return copy.deepcopy(guild_config(data, guild_id))
+
+# Writes from the commands run here, one at a time: a SQLite commit (fsync) stays off the
+# event loop, and the read-modify-write of "guilds" below never interleaves with another.
+_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trigger-store")
+
+async def run_write(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_WRITER, functools.partial(func, *args, **kwargs))
+
+def _guild_responses(guild_id):
+    # A copy of all guild entries and guild_id's own entry, which gets a copy of the
+    # inherited responder set on its first responder write.
+    data = STORE.snapshot()[0]
+    guilds = copy.deepcopy(data.get("guilds", {}))
+    guild = guilds.setdefault(str(guild_id), {})
+    if "responses" not in guild:
+        guild["responses"] = copy.deepcopy(data.get("responses", {}))
+    return guilds, guild
+
+def upsert_responder(name, value, guild_id=None):
+    if guild_id is None:
+        STORE.upsert_responder(name, value)
+        return
+    guilds, guild = _guild_responses(guild_id)
+    guild["responses"][name] = value
+    STORE.update_settings(guilds=guilds)
+
+def upsert_responders(responders, guild_id=None):
+    if guild_id is None:
+        STORE.upsert_responders(responders)
+        return
+    guilds, guild = _guild_responses(guild_id)
+    guild["responses"].update(responders)
+    STORE.update_settings(guilds=guilds)
+
+def delete_responder(name, guild_id=None):
+    if guild_id is None:
+        STORE.delete_responder(name)
+        return
+    guilds, guild = _guild_responses(guild_id)
+    guild["responses"].pop(name, None)
+    STORE.update_settings(guilds=guilds)
+
+def update_settings(guild_id=None, **settings):
+    if guild_id is None:
+        STORE.update_settings(**settings)
+        return
+    guilds = copy.deepcopy(STORE.snapshot()[0].get("guilds", {}))
+    guild = guilds.get(str(guild_id), {})
+    scoped = {key: value for key, value in settings.items() if key in GUILD_SCOPED_SETTINGS or key in guild}
+    shared = {key: value for key, value in settings.items() if key not in scoped}
+    if scoped:
+        guild.update(scoped)
+        guilds[str(guild_id)] = guild
+        shared["guilds"] = guilds
+    STORE.update_settings(**shared)
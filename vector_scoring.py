@@ -0,0 +1,133 @@
+import difflib
+import math
+import os
+from fuzzy import SIMILARITY_THRESHOLD
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# "rules" scores tokens with the normalized lookup and difflib; "vector" shortlists
+# triggers for every token at once from character n-gram TF-IDF vectors, then confirms
+# them with the same difflib ratio. Needs NumPy and SciPy.
+SCORING_ENGINE = os.getenv("SCORING_ENGINE", "rules").lower()
+# Cosine similarity a token needs with a trigger to be shortlisted. Cosine alone is a poor
+# judge (a short token like "one" scores 0.45 against "phone"), so it only has to be low
+# enough not to lose hits: at 0.1 bench_matcher's reference sample agrees on every message.
+VECTOR_THRESHOLD = float(os.getenv("VECTOR_THRESHOLD", "0.1"))
+NGRAM_SIZE = 3
+
+if SCORING_ENGINE not in ("rules", "vector"):
+    raise ValueError(f"Unknown SCORING_ENGINE {SCORING_ENGINE!r}, expected rules or vector")
+# Without SciPy the trigger matrix would be dense, which is slower than the rules engine.
+if SCORING_ENGINE == "vector" and (np is None or sparse is None):
+    print("SCORING_ENGINE=vector needs NumPy and SciPy, which are not both installed; using the rules engine")
+VECTOR_ENABLED = SCORING_ENGINE == "vector" and np is not None and sparse is not None
+
+def ngrams(text):
+    padded = f" {text} "
+    if len(padded) <= NGRAM_SIZE:
+        return [padded]
+    return [padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+def _counts(text):
+    counts = {}
+    for gram in ngrams(text):
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+def _ratio(token, trigger):
+    # SequenceMatcher.ratio(), skipped (as 0) when its cheap upper bounds already rule it out.
+    matcher = difflib.SequenceMatcher(None, token, trigger)
+    if matcher.real_quick_ratio() <= SIMILARITY_THRESHOLD or matcher.quick_ratio() <= SIMILARITY_THRESHOLD:
+        return 0.0
+    return matcher.ratio()
+
+class VectorScorer:
+    # The trigger matrix (one L2-normalized TF-IDF row per trigger) is built once per
+    # config version; a message costs one sparse product against it, plus a difflib
+    # ratio for each shortlisted (token, trigger) pair.
+
+    def __init__(self, entries, responder_count, threshold=VECTOR_THRESHOLD):
+        self.threshold = threshold
+        self.responder_count = responder_count
+        triggers = {}
+        for trigger, owner in entries:
+            trigger = " ".join(trigger.lower().split())
+            if trigger:
+                triggers.setdefault(trigger, set()).add(owner)
+        self._triggers = list(triggers)
+        self._owners = [np.array(sorted(owners), dtype=np.intp) for owners in triggers.values()]
+        self._vocab = {}
+        counts = []
+        for trigger in triggers:
+            counts.append(_counts(trigger))
+            for gram in counts[-1]:
+                self._vocab.setdefault(gram, len(self._vocab))
+
+        document_frequency = np.zeros(len(self._vocab))
+        for row in counts:
+            for gram in row:
+                document_frequency[self._vocab[gram]] += 1
+        self._idf = np.log((1 + len(counts)) / (1 + document_frequency)) + 1
+        # N-grams no trigger contains still count towards a token's length.
+        self._unseen_idf = math.log(1 + len(counts)) + 1
+
+        rows, cols, values = [], [], []
+        for row, row_counts in enumerate(counts):
+            weights = {self._vocab[gram]: count * self._idf[self._vocab[gram]] for gram, count in row_counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for col, weight in weights.items():
+                rows.append(row)
+                cols.append(col)
+                values.append(weight / norm)
+        self._matrix_t = sparse.csr_matrix((values, (cols, rows)), shape=(len(self._vocab), len(counts)))
+
+    def __len__(self):
+        return len(self._triggers)
+
+    def _token_matrix(self, tokens):
+        rows, cols, values = [], [], []
+        for row, token in enumerate(tokens):
+            seen = []
+            unseen = 0.0
+            for gram, count in _counts(token).items():
+                col = self._vocab.get(gram)
+                if col is None:
+                    unseen += (count * self._unseen_idf) ** 2
+                else:
+                    seen.append((col, count * self._idf[col]))
+            norm = math.sqrt(sum(w * w for _, w in seen) + unseen)
+            for col, weight in seen:
+                rows.append(row)
+                cols.append(col)
+                values.append(weight / norm)
+        return rows, cols, values
+
+    def scores(self, tokens):
+        # Best confirmed difflib ratio of any token with any of each responder's triggers.
+        best = np.zeros(self.responder_count)
+        tokens = list({token for token in tokens if any(ch.isalnum() for ch in token)})
+        if not tokens or not len(self):
+            return best
+        rows, cols, values = self._token_matrix(tokens)
+        if not values:
+            return best
+        query = sparse.csr_matrix((values, (rows, cols)), shape=(len(tokens), len(self._vocab)))
+        similarity = (query @ self._matrix_t).toarray()
+        for row, col in zip(*np.nonzero(similarity >= self.threshold)):
+            ratio = _ratio(tokens[row], self._triggers[col])
+            if ratio > SIMILARITY_THRESHOLD:
+                owners = self._owners[col]
+                best[owners] = np.maximum(best[owners], ratio)
+        return best
+
+    def owners(self, tokens):
+        # position -> confidence for every responder with a confirmed hit.
+        best = self.scores(tokens)
+        return {int(position): float(best[position]) for position in np.flatnonzero(best)}
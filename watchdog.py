@@ -0,0 +1,94 @@
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "0.25"))
+# A loop that has not run the probe for this long is considered stalled and its stack is captured.
+WATCHDOG_STALL = float(os.getenv("WATCHDOG_STALL", "0.5"))
+# Lag is judged on the worst sample over this many seconds, so one spike does not flap /health.
+WATCHDOG_WINDOW = float(os.getenv("WATCHDOG_WINDOW", "10"))
+HEALTH_LAG_DEGRADED = float(os.getenv("HEALTH_LAG_DEGRADED", "0.1"))
+HEALTH_LAG_UNHEALTHY = float(os.getenv("HEALTH_LAG_UNHEALTHY", "1.0"))
+HEALTH_LATENCY_DEGRADED = float(os.getenv("HEALTH_LATENCY_DEGRADED", "0.5"))
+HEALTH_LATENCY_UNHEALTHY = float(os.getenv("HEALTH_LATENCY_UNHEALTHY", "2.0"))
+
+class LoopMonitor:
+    # Measures event-loop scheduling lag with a periodic probe task, and watches the probe
+    # from a separate thread so a loop that is blocked right now can be caught in the act.
+
+    def __init__(self, latency, interval=WATCHDOG_INTERVAL, stall=WATCHDOG_STALL, window=WATCHDOG_WINDOW):
+        self.latency = latency
+        self.interval = interval
+        self.stall = stall
+        self.connected = False
+        self.last_lag = 0.0
+        self.stalls = 0
+        self.last_stall = None
+        self._samples = deque(maxlen=max(1, int(window / interval)))
+        self._beat = None
+        self._loop_thread_id = None
+        self._stalled = False
+        self._task = None
+
+    def start(self, loop):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = loop.create_task(self._probe())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def _probe(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(0.0, now - expected)
+            self._samples.append(self.last_lag)
+            self._beat = now
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            blocked_for = time.monotonic() - self._beat - self.interval
+            if blocked_for < self.stall:
+                self._stalled = False
+                continue
+            if self._stalled:
+                continue
+            # Report each stall once, with whatever the loop thread is executing now.
+            self._stalled = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.last_stall = {"at": time.time(), "blocked_for": blocked_for, "stack": stack}
+            print(f"Event loop blocked for {blocked_for:.2f}s, stack of the loop thread:\n{stack}")
+
+    def lag_samples(self):
+        return list(self._samples)
+
+    @property
+    def max_lag(self):
+        return max(self._samples, default=0.0)
+
+    def health(self):
+        # Returns (state, details) where state is healthy, degraded or unhealthy.
+        latency = self.latency()
+        if latency is not None and not math.isfinite(latency):
+            latency = None
+        lag = self.max_lag
+        if self._beat is not None:
+            # Counts a stall that is still in progress, before the probe can record it.
+            lag = max(lag, time.monotonic() - self._beat - self.interval)
+        details = {"loop_lag": round(lag, 4), "latency": latency, "connected": self.connected, "stalls": self.stalls}
+
+        if self._task is None or not self.connected or latency is None or lag >= HEALTH_LAG_UNHEALTHY or latency >= HEALTH_LATENCY_UNHEALTHY:
+            state = "unhealthy"
+        elif lag >= HEALTH_LAG_DEGRADED or latency >= HEALTH_LATENCY_DEGRADED:
+            state = "degraded"
+        else:
+            state = "healthy"
+        return state, details
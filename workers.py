@@ -0,0 +1,127 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+import matcher
+import trigger_index
+
+# inline = run on the event loop (default), thread = shared model in a thread pool,
+# process = each worker process loads its own spaCy model and trigger index.
+MATCH_EXECUTOR = os.getenv("MATCH_EXECUTOR", "inline").lower()
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+MATCH_QUEUE_DEPTH = int(os.getenv("MATCH_QUEUE_DEPTH", "64"))
+MATCH_TIMEOUT = float(os.getenv("MATCH_TIMEOUT", "2.0"))
+
+_worker_nlp = None
+_worker_version = None
+
+def _init_process_worker():
+    global _worker_nlp
+    _worker_nlp = matcher.load_nlp_or_regex()
+    trigger_index.get_index()
+
+def _worker_index(version, guild_id):
+    # The parent's index version changes whenever it reloads; follow it by re-reading the file.
+    global _worker_version
+    if version != _worker_version:
+        _worker_version = version
+        trigger_index.invalidate()
+    return trigger_index.get_index(guild_id)
+
+def _match_in_process(content, version, guild_id):
+    return matcher.match(content, _worker_index(version, guild_id), _worker_nlp)
+
+def _match_many_in_process(contents, version, guild_id):
+    return matcher.match_many(contents, _worker_index(version, guild_id), _worker_nlp)
+
+class MatchPool:
+    def __init__(self, mode=MATCH_EXECUTOR, workers=MATCH_WORKERS, queue_depth=MATCH_QUEUE_DEPTH, timeout=MATCH_TIMEOUT):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown MATCH_EXECUTOR {mode!r}, expected inline, thread or process")
+        self.mode = mode
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.in_flight = 0
+        self.dropped = 0
+        self.timed_out = 0
+        self._executor = None
+
+    @property
+    def needs_local_model(self):
+        return self.mode != "process"
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matcher")
+            else:
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["workers"])
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_process_worker)
+        return self._executor
+
+    async def match(self, content, index, nlp):
+        if self.mode == "inline":
+            return matcher.match(content, index, nlp)
+        return await self._run(matcher.match, _match_in_process, content, index, nlp, None)
+
+    async def match_many(self, contents, index, nlp):
+        if self.mode == "inline":
+            return matcher.match_many(contents, index, nlp)
+        return await self._run(matcher.match_many, _match_many_in_process, contents, index, nlp, [None] * len(contents))
+
+    async def _run(self, thread_func, process_func, payload, index, nlp, default):
+        if self.in_flight >= self.queue_depth:
+            self.dropped += 1
+            return default
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            if self.mode == "thread":
+                job = executor.submit(thread_func, payload, index, nlp)
+            else:
+                job = executor.submit(process_func, payload, index.version, index.guild_id)
+        except BrokenExecutor as e:
+            print(f"Match worker pool failed, restarting it: {e}")
+            self.shutdown()
+            return default
+
+        # A job counts against the queue depth until it really finishes: a timed-out one is
+        # cancelled if it has not started yet, but one already running keeps its slot.
+        self.in_flight += 1
+        job.add_done_callback(lambda _: self._job_done(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return default
+        except BrokenExecutor as e:
+            print(f"Match worker pool failed, restarting it: {e}")
+            self.shutdown()
+            return default
+
+    def _job_done(self, loop):
+        # Runs in the executor's thread; the count itself is only touched on the loop.
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:
+            pass  # the loop is closed, so nothing is waiting on the count any more
+
+    def _finished(self):
+        self.in_flight -= 1
+
+    def warm_up(self, index):
+        # Starts every worker process and has it load its model before the first message.
+        if self.mode != "process":
+            return
+        executor = self._get_executor()
+        futures = [executor.submit(_match_in_process, "warm up", index.version, None) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,2 +1,9 @@
-# wsgi.py
-from main import app
+import os
+
+if os.getenv("SEPARATE_BOT_PROCESS", "0") == "1":
+    # The bot runs on its own via `python main.py`; workers only serve HTTP.
+    from health_app import app
+else:
+    from main import app, launch
+
+    launch()